@@ -0,0 +1,63 @@
+"""jsonb_gin_indexes
+
+Revision ID: 3f9c2a1d7b4e
+Revises: e5ffcf8e5b5b
+Create Date: 2026-10-19 09:12:44.120931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2a1d7b4e'
+down_revision: Union[str, None] = 'e5ffcf8e5b5b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        'operations', 'extra_data',
+        existing_type=sa.JSON(),
+        type_=postgresql.JSONB(),
+        postgresql_using='extra_data::jsonb',
+        existing_nullable=True
+    )
+    op.alter_column(
+        'operations', 'terms',
+        existing_type=sa.JSON(),
+        type_=postgresql.JSONB(),
+        postgresql_using='terms::jsonb',
+        existing_nullable=True
+    )
+    op.create_index(
+        'ix_operations_extra_data', 'operations', ['extra_data'], unique=False,
+        postgresql_using='gin', postgresql_ops={'extra_data': 'jsonb_path_ops'}
+    )
+    op.create_index(
+        'ix_operations_terms', 'operations', ['terms'], unique=False,
+        postgresql_using='gin', postgresql_ops={'terms': 'jsonb_path_ops'}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_operations_terms', table_name='operations')
+    op.drop_index('ix_operations_extra_data', table_name='operations')
+    op.alter_column(
+        'operations', 'terms',
+        existing_type=postgresql.JSONB(),
+        type_=sa.JSON(),
+        postgresql_using='terms::json',
+        existing_nullable=True
+    )
+    op.alter_column(
+        'operations', 'extra_data',
+        existing_type=postgresql.JSONB(),
+        type_=sa.JSON(),
+        postgresql_using='extra_data::json',
+        existing_nullable=True
+    )
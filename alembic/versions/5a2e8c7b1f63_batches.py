@@ -0,0 +1,34 @@
+"""batches
+
+Revision ID: 5a2e8c7b1f63
+Revises: c41d9e6a5f02
+Create Date: 2026-10-19 13:41:52.907216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a2e8c7b1f63'
+down_revision: Union[str, None] = 'c41d9e6a5f02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('batches',
+    sa.Column('batch_id', sa.String(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('finalized_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('batch_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('batches')
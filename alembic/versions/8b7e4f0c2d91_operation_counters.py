@@ -0,0 +1,40 @@
+"""operation_counters
+
+Revision ID: 8b7e4f0c2d91
+Revises: 3f9c2a1d7b4e
+Create Date: 2026-10-19 10:03:17.552084
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b7e4f0c2d91'
+down_revision: Union[str, None] = '3f9c2a1d7b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('operation_counters',
+    sa.Column('scope', sa.String(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('scope', 'type', 'name', 'shard')
+    )
+    # Seed the status counters from the existing rows so the rollups start out consistent
+    op.execute(
+        "INSERT INTO operation_counters (scope, type, name, shard, value) "
+        "SELECT 'status', lower(type::text), lower(status::text), 0, count(*) "
+        "FROM operations WHERE type IS NOT NULL AND status IS NOT NULL "
+        "GROUP BY type, status"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('operation_counters')
@@ -0,0 +1,31 @@
+"""operation_cancellation
+
+Revision ID: 9d3b6f2a4c18
+Revises: 5a2e8c7b1f63
+Create Date: 2026-10-19 15:02:37.480512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3b6f2a4c18'
+down_revision: Union[str, None] = '5a2e8c7b1f63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ALTER TYPE ... ADD VALUE cannot run inside a transaction block before Postgres 12
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE operationstatus ADD VALUE IF NOT EXISTS 'CANCELLED'")
+    op.add_column('batches', sa.Column('cancelled', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    # Postgres cannot drop a value from an enum type; CANCELLED stays defined but unused
+    op.execute("UPDATE operations SET status = 'FAILED' WHERE status = 'CANCELLED'")
+    op.drop_column('batches', 'cancelled')
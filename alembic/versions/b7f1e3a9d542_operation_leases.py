@@ -0,0 +1,33 @@
+"""operation_leases
+
+Revision ID: b7f1e3a9d542
+Revises: 9d3b6f2a4c18
+Create Date: 2026-10-19 16:27:09.316845
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7f1e3a9d542'
+down_revision: Union[str, None] = '9d3b6f2a4c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('operations', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('operations', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.create_index(
+        'ix_operations_lease_expires_at', 'operations', ['lease_expires_at'], unique=False,
+        postgresql_where=sa.text("status = 'IN_PROGRESS'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_operations_lease_expires_at', table_name='operations')
+    op.drop_column('operations', 'attempts')
+    op.drop_column('operations', 'lease_expires_at')
@@ -0,0 +1,33 @@
+"""idempotency_keys
+
+Revision ID: c41d9e6a5f02
+Revises: 8b7e4f0c2d91
+Create Date: 2026-10-19 11:26:05.318447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d9e6a5f02'
+down_revision: Union[str, None] = '8b7e4f0c2d91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('idempotency_keys',
+    sa.Column('endpoint', sa.String(), nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('response', postgresql.JSONB(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('endpoint', 'key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,27 @@
+"""windowed_latency_counters
+
+Revision ID: e2c6a8d4b731
+Revises: b7f1e3a9d542
+Create Date: 2026-10-19 18:02:41.507218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2c6a8d4b731'
+down_revision: Union[str, None] = 'b7f1e3a9d542'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Latency buckets moved into the per-minute scopes; the all-time histogram is no longer read
+    op.execute("DELETE FROM operation_counters WHERE scope = 'latency'")
+
+
+def downgrade() -> None:
+    # The all-time histogram can't be rebuilt; it starts over from zero
+    pass
@@ -0,0 +1,130 @@
+"""
+Admission control.
+Regular work is shed with a retry hint once the backlog (broker queue depth or PENDING
+operations, whichever is larger) outgrows what the worker pool can drain; expedited work
+is always admitted. The same snapshot doubles as the capacity signal for autoscaling.
+"""
+import logging
+import math
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core import stats
+from app.core.config import get_settings
+from app.models.operation import OperationStatus
+from app.tasks.dispatch import get_dispatcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRY_AFTER_SECONDS = 5
+MAX_RETRY_AFTER_SECONDS = 300
+
+
+@dataclass
+class CapacitySnapshot:
+    queue_depth: int
+    pending: int
+    worker_replicas: int
+    worker_concurrency: int
+    backlog_limit: int
+    finish_rate: float  # operations finished per second, recent
+
+    @property
+    def capacity_slots(self) -> int:
+        return self.worker_replicas * self.worker_concurrency
+
+    @property
+    def backlog(self) -> int:
+        return max(self.queue_depth, self.pending)
+
+    @property
+    def accepting_regular(self) -> bool:
+        return self.backlog < self.backlog_limit
+
+    def retry_after(self, incoming: int = 0) -> int:
+        """Seconds until the backlog should have drained below the limit at the recent finish rate"""
+        excess = self.backlog + incoming - self.backlog_limit
+        if excess <= 0:
+            return 0
+        if self.finish_rate <= 0:
+            return DEFAULT_RETRY_AFTER_SECONDS
+        return min(max(math.ceil(excess / self.finish_rate), 1), MAX_RETRY_AFTER_SECONDS)
+
+
+class AdmissionController:
+    def __init__(
+            self,
+            worker_replicas: int,
+            worker_concurrency: int,
+            max_backlog_per_slot: int,
+            check_interval: float = 1.0,
+            queue_depth_probe: Optional[Callable[[], int]] = None
+    ):
+        self.worker_replicas = worker_replicas
+        self.worker_concurrency = worker_concurrency
+        self.max_backlog_per_slot = max_backlog_per_slot
+        self.check_interval = check_interval
+        self.queue_depth_probe = queue_depth_probe or (lambda: get_dispatcher().queue_depth())
+        self._snapshot: Optional[CapacitySnapshot] = None
+        self._taken_at = float("-inf")
+
+    def _queue_depth(self) -> int:
+        try:
+            return self.queue_depth_probe()
+        except Exception as e:
+            # Don't turn a broker hiccup into an outage; the PENDING count still bounds the backlog
+            logger.warning(f"Queue depth probe failed: {str(e)}")
+            return 0
+
+    def snapshot(self, db: Session) -> CapacitySnapshot:
+        """Current load, refreshed at most once per check_interval"""
+        now = time.monotonic()
+        if self._snapshot is None or now - self._taken_at >= self.check_interval:
+            self._snapshot = CapacitySnapshot(
+                queue_depth=self._queue_depth(),
+                pending=stats.get_status_total(db, OperationStatus.PENDING),
+                worker_replicas=self.worker_replicas,
+                worker_concurrency=self.worker_concurrency,
+                backlog_limit=self.worker_replicas * self.worker_concurrency * self.max_backlog_per_slot,
+                finish_rate=stats.get_recent_finish_rate(db)
+            )
+            self._taken_at = now
+        return self._snapshot
+
+    def admit(self, db: Session, regular: int) -> int:
+        """
+        Decide on a submission carrying `regular` regular operations (expedited ones don't count).
+        Returns 0 when admitted, otherwise the number of seconds the client should wait.
+        """
+        if not regular:
+            return 0
+        snapshot = self.snapshot(db)
+        if snapshot.accepting_regular:
+            return 0
+        return snapshot.retry_after(regular)
+
+
+def desired_worker_replicas(snapshot: CapacitySnapshot) -> int:
+    """Replica count that would bring the backlog down to the autoscaling target per slot"""
+    settings = get_settings()
+    per_replica = snapshot.worker_concurrency * settings.AUTOSCALE_TARGET_BACKLOG_PER_SLOT
+    desired = math.ceil(snapshot.backlog / per_replica) if per_replica else snapshot.worker_replicas
+    return min(
+        max(desired, settings.AUTOSCALE_MIN_WORKER_REPLICAS),
+        settings.AUTOSCALE_MAX_WORKER_REPLICAS
+    )
+
+
+@lru_cache
+def get_admission_controller() -> AdmissionController:
+    settings = get_settings()
+    return AdmissionController(
+        worker_replicas=settings.CELERY_WORKER_REPLICAS,
+        worker_concurrency=settings.CELERY_WORKER_CONCURRENCY,
+        max_backlog_per_slot=settings.ADMISSION_MAX_BACKLOG_PER_SLOT,
+        check_interval=settings.ADMISSION_CHECK_INTERVAL_SECONDS
+    )
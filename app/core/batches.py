@@ -0,0 +1,43 @@
+from typing import Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.models.batch import Batch
+
+
+def create(db: Session, batch_id: str, total: int) -> None:
+    """Add the tracking row to the current transaction"""
+    db.add(Batch(batch_id=batch_id, total=total, completed=0, failed=0, cancelled=0))
+
+
+def record_finished(
+        db: Session, batch_id: str, completed: int = 0, failed: int = 0, cancelled: int = 0
+) -> bool:
+    """
+    Count finished operations towards the batch, inside the caller's transaction.
+    Returns True for exactly one caller: the one whose update brings the batch to its total.
+    The counter update takes the row lock, so concurrent workers serialize on it and
+    each sees the previous workers' increments when checking for completion.
+    """
+    updated = db.query(Batch).filter(Batch.batch_id == batch_id).update(
+        {
+            Batch.completed: Batch.completed + completed,
+            Batch.failed: Batch.failed + failed,
+            Batch.cancelled: Batch.cancelled + cancelled
+        },
+        synchronize_session=False
+    )
+    if not updated:
+        return False
+
+    finalized = db.query(Batch).filter(
+        Batch.batch_id == batch_id,
+        Batch.finalized_at.is_(None),
+        Batch.completed + Batch.failed + Batch.cancelled >= Batch.total
+    ).update({Batch.finalized_at: func.now()}, synchronize_session=False)
+    return finalized == 1
+
+
+def get(db: Session, batch_id: str) -> Optional[Batch]:
+    return db.query(Batch).get(batch_id)
@@ -1,3 +1,6 @@
+from functools import lru_cache
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -11,16 +14,64 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str
     POSTGRES_PORT: str
 
+    # Optional streaming replica for read-only routes (same credentials and database name)
+    POSTGRES_REPLICA_HOST: Optional[str] = None
+    POSTGRES_REPLICA_PORT: Optional[str] = None
+    # Reads fall back to the primary when the replica is further behind than this,
+    # and a client is pinned to the primary for this long after its own writes
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = 1.0
+
     REDIS_HOST: str
     REDIS_PORT: str
 
     CELERY_WORKER_REPLICAS: int = 2
     CELERY_WORKER_CONCURRENCY: int = 4
 
+    # Admission control: regular work is rejected (429) once the backlog exceeds
+    # ADMISSION_MAX_BACKLOG_PER_SLOT per worker slot (replicas x concurrency);
+    # expedited work is always admitted
+    ADMISSION_MAX_BACKLOG_PER_SLOT: int = 500
+    ADMISSION_CHECK_INTERVAL_SECONDS: float = 1.0
+    # Autoscaling signal: backlog per slot the pool should be sized for, and its bounds
+    AUTOSCALE_TARGET_BACKLOG_PER_SLOT: int = 50
+    AUTOSCALE_MIN_WORKER_REPLICAS: int = 1
+    AUTOSCALE_MAX_WORKER_REPLICAS: int = 10
+
+    # Responses smaller than this (bytes) are sent uncompressed
+    GZIP_MINIMUM_SIZE: int = 1024
+
+    # "celery" publishes tasks to the broker, "inprocess" runs them in the API process
+    TASK_DISPATCHER: str = "celery"
+    # Batches are processed in chunks of this many operations per task
+    BATCH_CHUNK_SIZE: int = 100
+    # Results of recently evaluated terms kept per worker process and reused across batches;
+    # 0 keeps only the deduplication of identical terms within a chunk
+    RESULT_CACHE_SIZE: int = 10_000
+
+    # Workers hold a lease on the operations they claim; the reaper requeues IN_PROGRESS
+    # operations whose lease expired (worker died) up to LEASE_MAX_ATTEMPTS claims, then fails them
+    OPERATION_LEASE_SECONDS: int = 300
+    LEASE_MAX_ATTEMPTS: int = 3
+    LEASE_REAPER_INTERVAL_SECONDS: float = 60.0
+    LEASE_REAPER_BATCH_SIZE: int = 1000
+
+    # Per-minute throughput counters older than this are deleted by the periodic stats sweep
+    # (the stats endpoint reads at most 1440 minutes back)
+    STATS_MINUTE_RETENTION_MINUTES: int = 1440
+    STATS_PRUNE_INTERVAL_SECONDS: float = 600.0
+
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def SQLALCHEMY_REPLICA_DATABASE_URI(self) -> Optional[str]:
+        if not self.POSTGRES_REPLICA_HOST:
+            return None
+        port = self.POSTGRES_REPLICA_PORT or self.POSTGRES_PORT
+        return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_REPLICA_HOST}:{port}/{self.POSTGRES_DB}"
+
     @property
     def CELERY_BROKER_URL(self) -> str:
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/0"
@@ -34,4 +85,14 @@ class Settings(BaseSettings):
         env_file = ".env"
 
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """Settings are read (and validated) on first use instead of at import"""
+    return Settings()
+
+
+def __getattr__(name: str):
+    # Keeps `from app.core.config import settings` working for callers that want eager settings
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,14 +1,111 @@
-from sqlalchemy import create_engine
+import logging
+import time
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
-from .config import settings
+from .config import get_settings
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
+# Seconds the replica is behind the primary; 0 when it has replayed everything it received
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "END"
+)
+
+
+@lru_cache
+def get_engine() -> Engine:
+    """The engine (and the DBAPI driver) is only created when the database is first used"""
+    return create_engine(get_settings().SQLALCHEMY_DATABASE_URI)
+
+
+@lru_cache
+def get_sessionmaker() -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+def SessionLocal() -> Session:
+    return get_sessionmaker()()
+
+
+class ReadRouter:
+    """
+    Hands out sessions for read-only work.
+    Uses the replica while its measured lag is within max_lag, otherwise (or when the
+    caller asks for read-your-writes) the primary. The lag is probed at most once per
+    check_interval, so routing costs nothing per request.
+    """
+
+    def __init__(
+            self,
+            primary: sessionmaker,
+            replica: Optional[sessionmaker] = None,
+            max_lag: float = 5.0,
+            check_interval: float = 1.0
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._lag: Optional[float] = None
+        self._checked_at = float("-inf")
+
+    def _measure_lag(self) -> Optional[float]:
+        try:
+            with self.replica() as db:
+                if db.get_bind().dialect.name != "postgresql":
+                    return 0.0
+                return float(db.execute(REPLICA_LAG_QUERY).scalar() or 0.0)
+        except Exception as e:
+            logger.warning(f"Replica lag check failed, reading from primary: {str(e)}")
+            return None
+
+    def replica_lag(self) -> Optional[float]:
+        """Last measured lag in seconds, None when the replica is unreachable"""
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._lag = self._measure_lag()
+            self._checked_at = now
+        return self._lag
+
+    def use_replica(self) -> bool:
+        if self.replica is None:
+            return False
+        lag = self.replica_lag()
+        return lag is not None and lag <= self.max_lag
+
+    def session(self, prefer_primary: bool = False) -> Session:
+        if not prefer_primary and self.use_replica():
+            return self.replica()
+        return self.primary()
+
+
+@lru_cache
+def get_read_router() -> ReadRouter:
+    settings = get_settings()
+    replica = None
+    if settings.SQLALCHEMY_REPLICA_DATABASE_URI:
+        replica = sessionmaker(
+            autocommit=False, autoflush=False,
+            bind=create_engine(settings.SQLALCHEMY_REPLICA_DATABASE_URI)
+        )
+    return ReadRouter(
+        get_sessionmaker(),
+        replica,
+        max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+        check_interval=settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS
+    )
+
 
 def get_db():
     db = SessionLocal()
@@ -0,0 +1,94 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.idempotency import IdempotencyKey
+
+OPERATION_ENDPOINT = "operation"
+BATCH_ENDPOINT = "batch"
+
+CACHE_SIZE = 10_000
+
+
+class _RecentResponses:
+    """Bounded LRU of responses this process has stored or replayed recently"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+
+    def get(self, endpoint: str, key: str) -> Optional[Dict]:
+        entry = self._entries.get((endpoint, key))
+        if entry is not None:
+            self._entries.move_to_end((endpoint, key))
+        return entry
+
+    def put(self, endpoint: str, key: str, response: Dict) -> None:
+        self._entries[(endpoint, key)] = response
+        self._entries.move_to_end((endpoint, key))
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_recent = _RecentResponses(CACHE_SIZE)
+
+
+def lookup(db: Session, endpoint: str, key: str) -> Optional[Dict]:
+    """
+    Response previously stored for this key, if any.
+    Recent keys are answered from memory; otherwise it's a primary key lookup.
+    """
+    response = _recent.get(endpoint, key)
+    if response is not None:
+        return response
+
+    row = db.query(IdempotencyKey.response).filter(
+        IdempotencyKey.endpoint == endpoint,
+        IdempotencyKey.key == key
+    ).first()
+    if row is None:
+        return None
+    _recent.put(endpoint, key, row.response)
+    return row.response
+
+
+def lock(db: Session, endpoint: str, key: str) -> Optional[Dict]:
+    """
+    Stored response for the key, read from the table with the row locked until the caller
+    commits or rolls back, so concurrent replays of the same key act on it one at a time.
+    """
+    row = db.query(IdempotencyKey.response).filter(
+        IdempotencyKey.endpoint == endpoint,
+        IdempotencyKey.key == key
+    ).with_for_update().first()
+    return row.response if row is not None else None
+
+
+def record(db: Session, endpoint: str, key: str, response: Dict) -> None:
+    """
+    Add the key to the current transaction.
+    If another request committed the same key first, the commit fails with an IntegrityError.
+    """
+    db.add(IdempotencyKey(endpoint=endpoint, key=key, response=response))
+
+
+def update(db: Session, endpoint: str, key: str, response: Dict) -> None:
+    """Replace the stored response (e.g. once the task id is known) and commit"""
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.endpoint == endpoint,
+        IdempotencyKey.key == key
+    ).update({IdempotencyKey.response: response}, synchronize_session=False)
+    db.commit()
+    _recent.put(endpoint, key, response)
+
+
+def remember(endpoint: str, key: str, response: Dict) -> None:
+    _recent.put(endpoint, key, response)
+
+
+def clear_cache() -> None:
+    _recent.clear()
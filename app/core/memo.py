@@ -0,0 +1,67 @@
+"""
+Memoization of operation results.
+Evaluation is a pure function of (type, terms), so operations with identical terms share one
+computation: within a chunk the rows are grouped by a canonical key and evaluated once per
+group, and successful results are kept in a bounded per-process LRU for later batches.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Mapping, Optional
+
+import orjson
+
+from app.core import expressions
+from app.core.config import get_settings
+from app.models.operation import OperationType
+
+
+def terms_key(op_type: Optional[OperationType], terms: Optional[Mapping]) -> str:
+    """
+    Canonical hash of type plus terms: key order and expression whitespace don't matter.
+    Raises TypeError for terms that aren't JSON serializable.
+    """
+    if terms and expressions.is_expression(terms):
+        terms = {**terms, "expression": expressions.expression_shape(terms["expression"])}
+    payload = orjson.dumps(
+        [op_type.value if op_type else None, terms], option=orjson.OPT_SORT_KEYS
+    )
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """Bounded, thread safe LRU of terms key -> result"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[int]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: int) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@lru_cache
+def get_result_cache() -> ResultCache:
+    return ResultCache(get_settings().RESULT_CACHE_SIZE)
@@ -0,0 +1,64 @@
+from typing import Any, Iterable, List
+
+import orjson
+from fastapi import Response
+
+from app.models.operation import Operation, OperationStatus, OperationType
+
+# Columns backing schemas.OperationOutput, in output order
+OPERATION_OUTPUT_COLUMNS = [
+    Operation.title,
+    Operation.description,
+    Operation.type,
+    Operation.terms,
+    Operation.result,
+    Operation.deadline,
+    Operation.expedited_reason,
+    Operation.extra_data,
+    Operation.id,
+    Operation.status,
+    Operation.created_at,
+    Operation.updated_at,
+]
+OPERATION_OUTPUT_FIELDS = [column.key for column in OPERATION_OUTPUT_COLUMNS]
+
+_TYPE_INDEX = OPERATION_OUTPUT_FIELDS.index("type")
+_STATUS_INDEX = OPERATION_OUTPUT_FIELDS.index("status")
+
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=_ORJSON_OPTIONS)
+
+
+def operation_row_to_dict(row: Iterable) -> dict:
+    """
+    Turn a row selected with OPERATION_OUTPUT_COLUMNS into an OperationOutput shaped dict.
+    Rows come straight from our own table, so the pydantic round trip is skipped;
+    only the model defaults are applied.
+    """
+    values = list(row)
+    if values[_TYPE_INDEX] is None:
+        values[_TYPE_INDEX] = OperationType.REGULAR
+    if values[_STATUS_INDEX] is None:
+        values[_STATUS_INDEX] = OperationStatus.PENDING
+    return dict(zip(OPERATION_OUTPUT_FIELDS, values))
+
+
+def operation_rows_to_json(rows: Iterable[Iterable]) -> bytes:
+    return dumps([operation_row_to_dict(row) for row in rows])
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded with orjson; content is either pre-encoded bytes or a plain structure"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+def operation_rows_response(rows: List) -> FastJSONResponse:
+    return FastJSONResponse(operation_rows_to_json(rows))
@@ -1,14 +1,17 @@
+import hashlib
 import logging
 import uuid
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from sqlalchemy import text
+from sqlalchemy import and_, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from app.core import admission, batches, idempotency, serialization, stats
 from app.models import operation as models
 from app.schemas import operation as schemas
-from app.tasks.worker import create_batch_processing_task
+from app.tasks.dispatch import DispatchResult, get_dispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +39,124 @@ class BatchOperationError(ServiceException):
         self.failed_operations = failed_operations or []
 
 
-def create_operation(db: Session, operation: schemas.OperationCreate) -> models.Operation:
+class OverloadedError(ServiceException):
+    """Raised when admission control sheds a submission"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def check_admission(db: Session, operations: List[schemas.OperationCreate]) -> None:
+    """Shed regular work while the backlog is over capacity; expedited work always goes through"""
+    regular = sum(1 for op in operations if op.type != models.OperationType.EXPEDITED)
+    retry_after = admission.get_admission_controller().admit(db, regular)
+    if retry_after:
+        raise OverloadedError(f"Work queue is full, retry in {retry_after}s", retry_after)
+
+
+def check_batch_admission(
+        db: Session, batch: schemas.BatchOperationCreate, idempotency_key: Optional[str] = None
+) -> Dict[int, str]:
+    """
+    Admission for a batch: while over capacity, its regular operations are shed and its
+    expedited ones still go through. Returns the shed operations (index -> reason) for
+    create_batch_operations to report as failed. Raises OverloadedError when nothing would
+    be admitted (the batch has only regular work, or it's atomic), and for keyed batches (an
+    idempotency key or a client batch_id): their response is stored under the key, so a retry
+    would replay the shed operations as failed instead of resubmitting them.
+    """
+    regular = [idx for idx, op in enumerate(batch.operations) if op.type != models.OperationType.EXPEDITED]
+    retry_after = admission.get_admission_controller().admit(db, len(regular))
+    if not retry_after:
+        return {}
+    message = f"Work queue is full, retry in {retry_after}s"
+    keyed = bool(idempotency_key or batch.batch_id)
+    if batch.atomic or keyed or len(regular) == len(batch.operations):
+        raise OverloadedError(message, retry_after)
+    return dict.fromkeys(regular, message)
+
+
+def is_replay(db: Session, endpoint: str, idempotency_key: Optional[str]) -> bool:
+    """Whether a response was already stored for this key (replays skip admission control)"""
+    return bool(idempotency_key) and idempotency.lookup(db, endpoint, idempotency_key) is not None
+
+
+def get_capacity(db: Session) -> Dict:
+    """Load and capacity signal for dashboards and the worker autoscaler"""
+    snapshot = admission.get_admission_controller().snapshot(db)
+    return {
+        "queue_depth": snapshot.queue_depth,
+        "pending": snapshot.pending,
+        "backlog": snapshot.backlog,
+        "backlog_limit": snapshot.backlog_limit,
+        "capacity_slots": snapshot.capacity_slots,
+        "finish_rate": snapshot.finish_rate,
+        "accepting_regular": snapshot.accepting_regular,
+        "retry_after": snapshot.retry_after(),
+        "worker_replicas": snapshot.worker_replicas,
+        "desired_worker_replicas": admission.desired_worker_replicas(snapshot),
+    }
+
+
+def create_batch_processing_task(operation_ids: List[int], batch_id: Optional[str] = None) -> DispatchResult:
+    """Hand a committed batch to the configured task dispatcher"""
+    return get_dispatcher().dispatch_batch(operation_ids, batch_id)
+
+
+def dispatch_operation(operation_id: int, operation_type: models.OperationType) -> DispatchResult:
+    """Hand a committed operation to the configured task dispatcher; expedited work goes first"""
+    return get_dispatcher().dispatch_operation(
+        operation_id, priority=0 if operation_type == models.OperationType.EXPEDITED else 9
+    )
+
+
+def _dispatched(response: Dict) -> bool:
+    # Responses stored before the dispatched flag existed carry the task id instead
+    return bool(response.get("dispatched")) or response.get("task_id") is not None
+
+
+def _dispatch_once(db: Session, endpoint: str, key: str, dispatch: Callable[[], DispatchResult]) -> Dict:
+    """
+    Dispatch the work recorded under an idempotency key unless the stored response says it
+    already was. The key is committed before dispatching, so a failed broker call leaves it
+    undispatched and the client's retry dispatches it. The key row stays locked while
+    dispatching, so concurrent retries dispatch once.
+    Returns the stored response.
+    """
+    response = idempotency.lookup(db, endpoint, key)
+    if response is not None and _dispatched(response):
+        return response
+
+    response = idempotency.lock(db, endpoint, key)
+    if _dispatched(response):
+        db.rollback()
+        return response
+    try:
+        result = dispatch()
+    except Exception:
+        db.rollback()
+        raise
+    response = {**response, "task_id": result.id, "dispatched": True}
+    idempotency.update(db, endpoint, key, response)
+    return response
+
+
+class DuplicateRequestError(ServiceException):
+    """Raised when a concurrent request with the same idempotency key committed first"""
+    pass
+
+
+class DuplicateBatchError(ServiceException):
+    """Raised when a batch_id is reused by a submission that isn't a replay of it"""
+    pass
+
+
+def create_operation(
+        db: Session,
+        operation: schemas.OperationCreate,
+        idempotency_key: Optional[str] = None
+) -> models.Operation:
     """Create a single operation"""
     try:
         # Only validate deadline for expedited operations
@@ -46,12 +166,24 @@ def create_operation(db: Session, operation: schemas.OperationCreate) -> models.
 
         db_operation = models.Operation(**operation.model_dump())
         db.add(db_operation)
+        stats.record_created(db, db_operation.type)
+        if idempotency_key:
+            db.flush()
+            response = {"operation_id": db_operation.id}
+            idempotency.record(db, idempotency.OPERATION_ENDPOINT, idempotency_key, response)
         db.commit()
         db.refresh(db_operation)
+        if idempotency_key:
+            idempotency.remember(idempotency.OPERATION_ENDPOINT, idempotency_key, response)
 
         logger.info(f"Created operation {db_operation=}")
         return db_operation
 
+    except IntegrityError as e:
+        db.rollback()
+        if idempotency_key:
+            raise DuplicateRequestError(f"Request {idempotency_key} was already processed")
+        raise ServiceException(f"An unexpected error occurred: {str(e)}")
     except Exception as e:
         db.rollback()
         if isinstance(e, ServiceException):
@@ -59,17 +191,72 @@ def create_operation(db: Session, operation: schemas.OperationCreate) -> models.
         raise ServiceException(f"An unexpected error occurred: {str(e)}")
 
 
+def get_replayed_operation(db: Session, idempotency_key: str) -> Optional[models.Operation]:
+    """The operation created by an earlier request with this idempotency key, if any"""
+    response = idempotency.lookup(db, idempotency.OPERATION_ENDPOINT, idempotency_key)
+    if response is None:
+        return None
+    return get_operation(db, response["operation_id"])
+
+
+def create_operation_once(
+        db: Session,
+        operation: schemas.OperationCreate,
+        idempotency_key: str
+) -> Tuple[models.Operation, bool]:
+    """
+    Create and dispatch an operation unless this idempotency key was already used.
+    A replay of a key whose dispatch never happened (e.g. the broker call failed) dispatches it.
+    Returns the operation and whether it was created by this call.
+    """
+    db_operation = get_replayed_operation(db, idempotency_key)
+    created = db_operation is None
+    if created:
+        try:
+            db_operation = create_operation(db, operation, idempotency_key)
+        except DuplicateRequestError:
+            db_operation, created = get_replayed_operation(db, idempotency_key), False
+
+    operation_id, operation_type = db_operation.id, db_operation.type
+    _dispatch_once(
+        db, idempotency.OPERATION_ENDPOINT, idempotency_key,
+        lambda: dispatch_operation(operation_id, operation_type)
+    )
+    return db_operation, created
+
+
 def create_batch_operations(
         db: Session,
-        batch: schemas.BatchOperationCreate
+        batch: schemas.BatchOperationCreate,
+        idempotency_key: Optional[str] = None,
+        shed: Optional[Dict[int, str]] = None
 ) -> schemas.BatchOperationResponse:
-    """Create multiple operations in a batch"""
+    """
+    Create multiple operations in a batch.
+    A replayed submission (same idempotency key, or the same client supplied batch_id
+    when no key is given) returns the original response without inserting again; it only
+    dispatches if the original request failed to.
+    Operations listed in `shed` (index -> reason, see check_batch_admission) are not created
+    and are reported as failed.
+    """
     operations = []
     failed_operations = []
-    # Use with caution, as this might produce duplicate batch ids
-    # possible improvement: use a more deterministic way to generate batch ids or
-    # a fast way to check if the batch id is already in use
     batch_id = str(uuid.uuid4()) if not batch.batch_id else batch.batch_id
+    idempotency_key = idempotency_key or batch.batch_id
+
+    if idempotency_key:
+        replayed = idempotency.lookup(db, idempotency.BATCH_ENDPOINT, idempotency_key)
+        if replayed is not None:
+            if replayed["successful_operations"] and not _dispatched(replayed):
+                operation_ids, replayed_batch_id = replayed["successful_operations"], replayed["batch_id"]
+                replayed = _dispatch_once(
+                    db, idempotency.BATCH_ENDPOINT, idempotency_key,
+                    lambda: create_batch_processing_task(operation_ids, replayed_batch_id)
+                )
+            return schemas.BatchOperationResponse(**replayed)
+    if batch.batch_id and batches.get(db, batch.batch_id) is not None:
+        # Submitted before under a different Idempotency-Key
+        raise DuplicateBatchError(f"Batch {batch.batch_id} already exists")
 
     try:
         # First pass: validate all operations if atomic=True
@@ -80,6 +267,11 @@ def create_batch_operations(
 
         # Second pass: create operations
         for idx, operation_data in enumerate(batch.operations):
+            if shed and idx in shed:
+                failed_operations.append(schemas.BatchOperationValidationError(
+                    index=idx, error=shed[idx], operation=operation_data.model_dump()
+                ))
+                continue
             try:
                 # Only validate deadline for expedited operations
                 if operation_data.type == models.OperationType.EXPEDITED and not operation_data.deadline:
@@ -114,25 +306,48 @@ def create_batch_operations(
 
         # If we have any successful operations, commit them
         if operations:
-            db.commit()
-            operation_ids = []
-            for op in operations:
-                db.refresh(op)
-                operation_ids.append(op.id)
-
-            # Create and launch batch processing for successful operations
-            batch_result = None
-            if operation_ids:
-                batch_result = create_batch_processing_task(operation_ids)
-
-            return schemas.BatchOperationResponse(
+            for operation_type in models.OperationType:
+                stats.record_created(
+                    db, operation_type, sum(1 for op in operations if op.type == operation_type)
+                )
+            # flush assigns the ids, no need to refresh every row after the commit
+            db.flush()
+            operation_ids = [op.id for op in operations]
+            batches.create(db, batch_id, len(operation_ids))
+
+            response = schemas.BatchOperationResponse(
                 batch_id=batch_id,
                 operation_count=len(batch.operations),
                 successful_operations=operation_ids,
                 failed_operations=failed_operations,
-                task_id=batch_result.id if batch_result else None,
                 status="processing" if operation_ids else "completed"
             )
+            if idempotency_key:
+                idempotency.record(
+                    db, idempotency.BATCH_ENDPOINT, idempotency_key, response.model_dump(mode="json")
+                )
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                replayed = idempotency_key and idempotency.lookup(db, idempotency.BATCH_ENDPOINT, idempotency_key)
+                if not replayed:
+                    if batch.batch_id and batches.get(db, batch.batch_id) is not None:
+                        raise DuplicateBatchError(f"Batch {batch.batch_id} already exists")
+                    raise
+                # A concurrent retry of the same batch won the race
+                return schemas.BatchOperationResponse(**replayed)
+
+            # Create and launch batch processing for successful operations
+            if idempotency_key:
+                stored = _dispatch_once(
+                    db, idempotency.BATCH_ENDPOINT, idempotency_key,
+                    lambda: create_batch_processing_task(operation_ids, batch_id)
+                )
+                response.task_id = stored["task_id"]
+            else:
+                response.task_id = create_batch_processing_task(operation_ids, batch_id).id
+            return response
         else:
             return schemas.BatchOperationResponse(
                 batch_id=batch_id,
@@ -142,11 +357,37 @@ def create_batch_operations(
                 status="failed"
             )
 
+    except DuplicateBatchError:
+        raise
     except Exception as e:
         db.rollback()
         raise BatchOperationError(f"Error creating batch: {str(e)}")
 
 
+def _json_equals(element, value: Any):
+    """Compare a single JSON path element against a python value (non-Postgres fallback)"""
+    if isinstance(value, bool):
+        return element.as_boolean() == value
+    if isinstance(value, int):
+        return element.as_integer() == value
+    if isinstance(value, float):
+        return element.as_float() == value
+    if isinstance(value, str):
+        return element.as_string() == value
+    return element == value
+
+
+def json_contains(db: Session, column, predicates: Dict):
+    """
+    Build a containment filter for a JSON column.
+    On Postgres this is a JSONB @> predicate served by the GIN (jsonb_path_ops) index,
+    elsewhere it falls back to per-key comparisons so SQLite keeps working.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return column.contains(predicates)
+    return and_(*(_json_equals(column[key], value) for key, value in predicates.items()))
+
+
 def get_operation(db: Session, operation_id: int) -> models.Operation:
     """Get a single operation by ID"""
     operation = db.query(models.Operation).get(operation_id)
@@ -155,56 +396,162 @@ def get_operation(db: Session, operation_id: int) -> models.Operation:
     return operation
 
 
+def _operations_query(
+        db: Session,
+        query,
+        operation_type: Optional[models.OperationType] = None,
+        batch_id: Optional[str] = None,
+        extra_data: Optional[Dict] = None,
+        terms: Optional[Dict] = None
+):
+    if operation_type:
+        query = query.filter(models.Operation.type == operation_type)
+
+    # batch_id lives at the top level of extra_data, so it folds into the same containment filter
+    extra_data_predicates = dict(extra_data or {})
+    if batch_id:
+        extra_data_predicates["batch_id"] = batch_id
+
+    if extra_data_predicates:
+        query = query.filter(json_contains(db, models.Operation.extra_data, extra_data_predicates))
+
+    if terms:
+        query = query.filter(json_contains(db, models.Operation.terms, terms))
+
+    return query.order_by(models.Operation.id)
+
+
 def list_operations(
         db: Session,
         skip: int = 0,
         limit: int = 100,
         operation_type: Optional[models.OperationType] = None,
-        batch_id: Optional[str] = None
+        batch_id: Optional[str] = None,
+        extra_data: Optional[Dict] = None,
+        terms: Optional[Dict] = None
 ) -> List[models.Operation]:
     """List operations with optional filtering"""
-    query = db.query(models.Operation)
+    query = _operations_query(db, db.query(models.Operation), operation_type, batch_id, extra_data, terms)
+    return query.offset(skip).limit(limit).all()
 
-    if operation_type:
-        query = query.filter(models.Operation.type == operation_type)
-
-    if batch_id:
-        query = query.filter(
-            models.Operation.extra_data.contains({"batch_extra_data": {"batch_id": batch_id}})
-        )
 
+def list_operation_rows(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        operation_type: Optional[models.OperationType] = None,
+        batch_id: Optional[str] = None,
+        extra_data: Optional[Dict] = None,
+        terms: Optional[Dict] = None
+) -> List[Tuple]:
+    """
+    Same as list_operations, but selects only the OperationOutput columns as plain row tuples
+    (no ORM instances / identity map) for the fast serialization path
+    """
+    query = _operations_query(
+        db, db.query(*serialization.OPERATION_OUTPUT_COLUMNS), operation_type, batch_id, extra_data, terms
+    )
     return query.offset(skip).limit(limit).all()
 
 
+def make_etag(*parts: Any) -> str:
+    """Strong ETag (quoted) for a version tuple"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def _last_modified():
+    return func.coalesce(models.Operation.updated_at, models.Operation.created_at)
+
+
+def operation_etag(operation: models.Operation) -> str:
+    return make_etag(operation.id, operation.status, operation.updated_at or operation.created_at)
+
+
+def get_operation_etag(db: Session, operation_id: int) -> Optional[str]:
+    """ETag of an operation from its version columns alone, None if it doesn't exist"""
+    row = db.query(models.Operation.id, models.Operation.status, _last_modified()).filter(
+        models.Operation.id == operation_id
+    ).first()
+    return make_etag(*row) if row else None
+
+
+def list_operations_etag(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        operation_type: Optional[models.OperationType] = None,
+        batch_id: Optional[str] = None,
+        extra_data: Optional[Dict] = None,
+        terms: Optional[Dict] = None
+) -> str:
+    """ETag of a list page: the ids, statuses and modification times of the rows it contains"""
+    query = _operations_query(
+        db,
+        db.query(models.Operation.id, models.Operation.status, _last_modified()),
+        operation_type, batch_id, extra_data, terms
+    )
+    return make_etag(skip, limit, *(tuple(row) for row in query.offset(skip).limit(limit).all()))
+
+
+def operation_rows_etag(skip: int, limit: int, rows: List[Tuple]) -> str:
+    """Same ETag as list_operations_etag, computed from already loaded OperationOutput rows"""
+    return make_etag(skip, limit, *((row.id, row.status, row.updated_at or row.created_at) for row in rows))
+
+
+def get_batch_status_etag(db: Session, batch_id: str) -> Optional[str]:
+    """
+    ETag of a batch status report, None if the batch has no operations.
+    Per status: how many members have it and when the latest of them last changed. Claims,
+    reaped leases, cancellations and deletes all move a member between (or out of) those
+    groups, so the version changes whenever the report does. The aggregate reads only the
+    version columns of the rows matched by the extra_data GIN index. The batch row adds the
+    finished counters and finalized_at that the report also carries.
+    """
+    rows = db.query(
+        models.Operation.status, func.count(), func.max(_last_modified())
+    ).filter(
+        json_contains(db, models.Operation.extra_data, {"batch_id": batch_id})
+    ).group_by(models.Operation.status).order_by(models.Operation.status).all()
+    if not rows:
+        return None
+    batch = batches.get(db, batch_id)
+    counters = (batch.completed, batch.failed, batch.cancelled, batch.finalized_at) if batch else None
+    return make_etag(batch_id, counters, *(tuple(row) for row in rows))
+
+
 def get_batch_status(db: Session, batch_id: str) -> Dict:
     """Get status information for a batch of operations"""
-    operations = db.query(models.Operation).filter(
-        text("extra_data->>'batch_id' = :batch_id")
-    ).params(batch_id=batch_id).all()
+    # Only the columns the status report needs; the full rows (terms, extra_data) are never loaded
+    operations = db.query(
+        models.Operation.id,
+        models.Operation.status,
+        models.Operation.extra_data["error"].as_string()
+    ).filter(
+        json_contains(db, models.Operation.extra_data, {"batch_id": batch_id})
+    ).order_by(models.Operation.id).all()
 
     if not operations:
         raise OperationNotFoundError(f"Batch {batch_id} not found")
 
-    status_count = {
-        models.OperationStatus.PENDING: 0,
-        models.OperationStatus.IN_PROGRESS: 0,
-        models.OperationStatus.COMPLETED: 0,
-        models.OperationStatus.FAILED: 0
-    }
+    status_count = dict.fromkeys(models.OperationStatus, 0)
 
-    for operation in operations:
-        status_count[operation.status] += 1
+    for _, status, _ in operations:
+        status_count[status] += 1
 
+    batch = batches.get(db, batch_id)
     return {
         "total_operations": len(operations),
         "status_count": status_count,
+        "finished_operations": batch.completed + batch.failed + batch.cancelled if batch else None,
+        "finalized_at": batch.finalized_at if batch else None,
         "operations": [
             {
-                "id": op.id,
-                "status": op.status,
-                "error": op.extra_data.get("error") if op.extra_data else None
+                "id": operation_id,
+                "status": status,
+                "error": error
             }
-            for op in operations
+            for operation_id, status, error in operations
         ]
     }
 
@@ -214,6 +561,144 @@ def delete_operation(db: Session, operation_id: int) -> None:
     operation = db.query(models.Operation).get(operation_id)
     if not operation:
         raise OperationNotFoundError(f"Operation {operation_id} not found")
-    
+
+    stats.record_deleted(db, operation.type, operation.status)
     db.delete(operation)
     db.commit()
+
+
+BULK_GET_LIMIT = 1000
+BULK_DELETE_CHUNK_SIZE = 1000
+
+
+def cancel_batch(db: Session, batch_id: str) -> Dict:
+    """
+    Cancel the operations of a batch that have not started yet.
+    One set-based UPDATE per operation type moves PENDING rows to CANCELLED; workers lock
+    rows while claiming them, so a row is either claimed or cancelled, never both.
+    Queued tasks stay in the broker but find their rows cancelled and skip them without
+    doing any work. Operations already in progress finish normally.
+    """
+    batch_filter = json_contains(db, models.Operation.extra_data, {"batch_id": batch_id})
+    batch = batches.get(db, batch_id)
+    if batch is None and not db.query(models.Operation.id).filter(batch_filter).first():
+        raise OperationNotFoundError(f"Batch {batch_id} not found")
+
+    try:
+        cancelled = 0
+        for operation_type in models.OperationType:
+            count = db.query(models.Operation).filter(
+                batch_filter,
+                models.Operation.type == operation_type,
+                models.Operation.status == models.OperationStatus.PENDING
+            ).update({models.Operation.status: models.OperationStatus.CANCELLED}, synchronize_session=False)
+            stats.record_transition(
+                db, operation_type, models.OperationStatus.PENDING, models.OperationStatus.CANCELLED, count
+            )
+            cancelled += count
+        finalized = batch is not None and batches.record_finished(db, batch_id, cancelled=cancelled)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error cancelling batch {batch_id}: {str(e)}")
+        raise ServiceException(f"Error cancelling batch: {str(e)}")
+
+    if finalized:
+        logger.info(f"Batch {batch_id} finalized by cancelling {cancelled} operations")
+    if batch is not None:
+        db.refresh(batch)
+    return {
+        "batch_id": batch_id,
+        "cancelled": cancelled,
+        "finalized_at": batch.finalized_at if batch else None
+    }
+
+
+def get_operation_rows_bulk(db: Session, operation_ids: List[int]) -> Tuple[List[Tuple], List[int]]:
+    """
+    Fetch many operations with a single IN query.
+    Returns the OperationOutput rows (in request order) and the ids that don't exist.
+    """
+    if len(operation_ids) > BULK_GET_LIMIT:
+        raise ValidationError(f"At most {BULK_GET_LIMIT} ids can be fetched at once")
+    unique_ids = list(dict.fromkeys(operation_ids))
+    rows = db.query(*serialization.OPERATION_OUTPUT_COLUMNS).filter(
+        models.Operation.id.in_(unique_ids)
+    ).all()
+    by_id = {row.id: row for row in rows}
+    return [by_id[i] for i in unique_ids if i in by_id], [i for i in unique_ids if i not in by_id]
+
+
+def delete_operations(
+        db: Session,
+        operation_ids: Optional[List[int]] = None,
+        batch_id: Optional[str] = None,
+        status: Optional[models.OperationStatus] = None,
+        older_than: Optional[datetime] = None,
+        chunk_size: int = BULK_DELETE_CHUNK_SIZE
+) -> int:
+    """
+    Delete operations by id list and/or filter (batch, status, created before older_than).
+    Works in chunks of set-based DELETEs, each in its own short transaction, so locks are
+    never held across the whole cleanup. Rows currently locked by a worker are skipped.
+    Returns the number of deleted operations.
+    """
+    filters = []
+    if batch_id is not None:
+        filters.append(json_contains(db, models.Operation.extra_data, {"batch_id": batch_id}))
+    if status is not None:
+        filters.append(models.Operation.status == status)
+    if older_than is not None:
+        filters.append(models.Operation.created_at < older_than)
+    if operation_ids is None and not filters:
+        # The filter loop below would walk (and delete) the whole table
+        raise ValidationError("Bulk delete needs ids or at least one filter")
+
+    def id_chunks():
+        if operation_ids is not None:
+            unique_ids = list(dict.fromkeys(operation_ids))
+            for start in range(0, len(unique_ids), chunk_size):
+                yield [models.Operation.id.in_(unique_ids[start:start + chunk_size])]
+        else:
+            # Deleted rows drop out of the filter, so the same query walks the whole set
+            while True:
+                yield []
+
+    deleted = 0
+    for id_filter in id_chunks():
+        try:
+            rows = db.query(
+                models.Operation.id, models.Operation.type, models.Operation.status
+            ).filter(*filters, *id_filter).order_by(models.Operation.id).limit(chunk_size).with_for_update(
+                skip_locked=True
+            ).all()
+            if not rows:
+                if operation_ids is None:
+                    break
+                db.rollback()
+                continue
+
+            counts: Dict[tuple, int] = {}
+            for _, operation_type, operation_status in rows:
+                counts[(operation_type, operation_status)] = counts.get((operation_type, operation_status), 0) + 1
+            for (operation_type, operation_status), count in counts.items():
+                stats.record_deleted(db, operation_type, operation_status, count)
+
+            db.query(models.Operation).filter(
+                models.Operation.id.in_([row.id for row in rows])
+            ).delete(synchronize_session=False)
+            db.commit()
+            deleted += len(rows)
+        except Exception as e:
+            db.rollback()
+            raise ServiceException(f"Bulk delete failed after {deleted} operations: {str(e)}")
+
+    db.rollback()
+    return deleted
+
+
+def get_operation_stats(db: Session, window_minutes: int = 60) -> Dict:
+    """Global and per-type status counts, throughput and latency percentiles from the rollup counters"""
+    if window_minutes < 1:
+        raise ValidationError("window_minutes must be at least 1")
+    return stats.get_stats(db, window_minutes)
@@ -0,0 +1,309 @@
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.operation import OperationStatus, OperationType
+from app.models.stats import OperationCounter
+
+COUNTER_SHARDS = 8
+# Session.info key of the increments waiting for the transaction to commit
+PENDING_INCREMENTS = "stats.pending_increments"
+
+STATUS_SCOPE = "status"
+MEMO_SCOPE = "memo"
+MINUTE_SCOPE_PREFIX = "minute:"
+# Latency buckets are per-minute counters named "latency:<upper bound>"
+LATENCY_NAME_PREFIX = "latency:"
+
+# Upper bounds (seconds) of the processing latency histogram buckets
+LATENCY_BUCKETS = [
+    0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600, float("inf")
+]
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+def _insert_for(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"Counters are not supported on {dialect}")
+
+
+def increment(db: Session, scope: str, op_type: str, name: str, amount: int = 1) -> None:
+    """
+    Add amount to a counter as part of the current transaction.
+    The increment is held on the session and applied when it commits (see apply_increments).
+    """
+    if not amount:
+        return
+    # Begins the transaction if needed, so rolling it back discards the increment
+    db.connection()
+    pending = db.info.setdefault(PENDING_INCREMENTS, {})
+    key = (scope, op_type, name)
+    pending[key] = pending.get(key, 0) + amount
+
+
+def apply_increments(db: Session) -> None:
+    """
+    Upsert the increments collected in this transaction, right before it commits.
+    They go to one random shard per transaction and are applied in (scope, type, name) order,
+    so concurrent transactions lock the counter rows they share in the same order and can't
+    deadlock on them; being last, the counter locks are also held for the shortest time.
+    """
+    pending = db.info.pop(PENDING_INCREMENTS, None)
+    if not pending:
+        return
+    insert = _insert_for(db)
+    shard = random.randrange(COUNTER_SHARDS)
+    for (scope, op_type, name), amount in sorted(pending.items()):
+        if not amount:
+            continue
+        statement = insert(OperationCounter.__table__).values(
+            scope=scope,
+            type=op_type,
+            name=name,
+            shard=shard,
+            value=amount
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=["scope", "type", "name", "shard"],
+            set_={"value": OperationCounter.__table__.c.value + statement.excluded.value}
+        )
+        db.execute(statement)
+
+
+@event.listens_for(Session, "before_commit")
+def _apply_on_commit(session: Session) -> None:
+    apply_increments(session)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_on_rollback(session: Session, transaction) -> None:
+    # Whatever is still pending when the outermost transaction ends was rolled back
+    if transaction.parent is None:
+        session.info.pop(PENDING_INCREMENTS, None)
+
+
+def _minute_scope(moment: datetime) -> str:
+    return f"{MINUTE_SCOPE_PREFIX}{moment.strftime('%Y-%m-%dT%H:%M')}"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _latency_bucket(seconds: float) -> str:
+    for bound in LATENCY_BUCKETS:
+        if seconds <= bound:
+            return f"{LATENCY_NAME_PREFIX}{bound}"
+    return f"{LATENCY_NAME_PREFIX}{LATENCY_BUCKETS[-1]}"
+
+
+def record_created(db: Session, op_type: OperationType, count: int = 1) -> None:
+    """Account for newly created (PENDING) operations"""
+    increment(db, STATUS_SCOPE, op_type.value, OperationStatus.PENDING.value, count)
+    increment(db, _minute_scope(_utcnow()), op_type.value, "created", count)
+
+
+def record_transition(
+        db: Session,
+        op_type: OperationType,
+        old_status: OperationStatus,
+        new_status: OperationStatus,
+        count: int = 1
+) -> None:
+    """Move count operations from one status counter to another"""
+    if old_status == new_status:
+        return
+    increment(db, STATUS_SCOPE, op_type.value, old_status.value, -count)
+    increment(db, STATUS_SCOPE, op_type.value, new_status.value, count)
+
+
+def record_finished(
+        db: Session,
+        op_type: OperationType,
+        old_status: OperationStatus,
+        new_status: OperationStatus,
+        created_at: Optional[datetime] = None
+) -> None:
+    """Account for an operation reaching a terminal status: status counts, throughput and latency"""
+    now = _utcnow()
+    record_transition(db, op_type, old_status, new_status)
+    increment(db, _minute_scope(now), op_type.value, new_status.value)
+
+    if created_at is not None:
+        if created_at.tzinfo is None:
+            # SQLite hands back naive UTC timestamps
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        latency = max((now - created_at).total_seconds(), 0.0)
+        increment(db, _minute_scope(now), op_type.value, _latency_bucket(latency))
+
+
+def record_finished_many(
+        db: Session,
+        op_type: OperationType,
+        old_status: OperationStatus,
+        new_status: OperationStatus,
+        created_ats: List[Optional[datetime]]
+) -> None:
+    """record_finished for a group of operations, folded into one increment per counter"""
+    if not created_ats:
+        return
+    now = _utcnow()
+    count = len(created_ats)
+    record_transition(db, op_type, old_status, new_status, count)
+    increment(db, _minute_scope(now), op_type.value, new_status.value, count)
+
+    buckets: Dict[str, int] = {}
+    for created_at in created_ats:
+        if created_at is None:
+            continue
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        bucket = _latency_bucket(max((now - created_at).total_seconds(), 0.0))
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+    for bucket, bucket_count in buckets.items():
+        increment(db, _minute_scope(now), op_type.value, bucket, bucket_count)
+
+
+def record_memoization(db: Session, op_type: OperationType, hits: int, misses: int) -> None:
+    """Account for evaluations served from memoized results (hits) or computed (misses)"""
+    increment(db, MEMO_SCOPE, op_type.value, "hits", hits)
+    increment(db, MEMO_SCOPE, op_type.value, "misses", misses)
+
+
+def record_abandoned(db: Session, op_type: OperationType, count: int) -> None:
+    """Account for claimed operations whose worker never finished them (lost throughput)"""
+    increment(db, _minute_scope(_utcnow()), op_type.value, "abandoned", count)
+
+
+def _memoization(hits: int, misses: int) -> Dict:
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else None}
+
+
+def record_deleted(db: Session, op_type: OperationType, status: OperationStatus, count: int = 1) -> None:
+    """Remove deleted operations from the status counters"""
+    increment(db, STATUS_SCOPE, op_type.value, status.value, -count)
+
+
+def prune_minute_counters(db: Session, retention_minutes: int) -> int:
+    """
+    Delete per-minute counters older than the retention window, inside the caller's transaction.
+    Minute scopes sort chronologically, so this is a range delete on the primary key prefix.
+    Returns the number of deleted counter rows.
+    """
+    cutoff = _minute_scope(_utcnow() - timedelta(minutes=retention_minutes))
+    return db.query(OperationCounter).filter(
+        OperationCounter.scope.like(f"{MINUTE_SCOPE_PREFIX}%"),
+        OperationCounter.scope < cutoff
+    ).delete(synchronize_session=False)
+
+
+def get_status_total(db: Session, status: OperationStatus) -> int:
+    """Number of operations currently in the given status, across types"""
+    total = db.query(func.sum(OperationCounter.value)).filter(
+        OperationCounter.scope == STATUS_SCOPE,
+        OperationCounter.name == status.value
+    ).scalar()
+    return int(total or 0)
+
+
+def get_recent_finish_rate(db: Session, minutes: int = 2) -> float:
+    """Operations finished (completed or failed) per second over the last few minutes"""
+    now = _utcnow()
+    total = db.query(func.sum(OperationCounter.value)).filter(
+        OperationCounter.scope.between(
+            _minute_scope(now - timedelta(minutes=minutes - 1)), _minute_scope(now)
+        ),
+        OperationCounter.name.in_([OperationStatus.COMPLETED.value, OperationStatus.FAILED.value])
+    ).scalar()
+    return int(total or 0) / (minutes * 60)
+
+
+def _percentiles(histogram: Dict[str, int]) -> Dict:
+    samples = sum(histogram.values())
+    result = {f"p{p}": None for p in LATENCY_PERCENTILES}
+    result["samples"] = samples
+    if not samples:
+        return result
+
+    for p in LATENCY_PERCENTILES:
+        threshold = samples * p / 100
+        cumulative = 0
+        for bound in LATENCY_BUCKETS:
+            cumulative += histogram.get(str(bound), 0)
+            if cumulative >= threshold:
+                # Report the bucket upper bound; the overflow bucket reports its lower bound
+                result[f"p{p}"] = bound if bound != float("inf") else LATENCY_BUCKETS[-2]
+                break
+    return result
+
+
+def get_stats(db: Session, window_minutes: int = 60) -> Dict:
+    """
+    Read the rollups. Cost depends on the number of counters (types x statuses,
+    latency buckets and minutes in the window), never on the size of the operations table.
+    """
+    now = _utcnow()
+    window_start = now - timedelta(minutes=window_minutes - 1)
+    counters = OperationCounter.__table__.c
+
+    rows = db.query(
+        OperationCounter.scope, OperationCounter.type, OperationCounter.name, OperationCounter.value
+    ).filter(
+        (counters.scope.in_([STATUS_SCOPE, MEMO_SCOPE]))
+        | (counters.scope.between(_minute_scope(window_start), _minute_scope(now)))
+    ).all()
+
+    types = [t.value for t in OperationType]
+    statuses = [s.value for s in OperationStatus]
+    status_count = {t: dict.fromkeys(statuses, 0) for t in types}
+    latency = {t: {} for t in types}
+    memo = {"hits": 0, "misses": 0}
+    minutes: Dict[str, Dict[str, int]] = {}
+
+    for scope, op_type, name, value in rows:
+        if op_type not in status_count:
+            continue
+        if scope == STATUS_SCOPE:
+            if name in status_count[op_type]:
+                status_count[op_type][name] += value
+        elif scope == MEMO_SCOPE:
+            if name in memo:
+                memo[name] += value
+        elif name.startswith(LATENCY_NAME_PREFIX):
+            bound = name[len(LATENCY_NAME_PREFIX):]
+            latency[op_type][bound] = latency[op_type].get(bound, 0) + value
+        else:
+            bucket = minutes.setdefault(scope[len(MINUTE_SCOPE_PREFIX):], {"created": 0, "completed": 0, "failed": 0, "abandoned": 0})
+            if name in bucket:
+                bucket[name] += value
+
+    total_latency: Dict[str, int] = {}
+    for histogram in latency.values():
+        for name, value in histogram.items():
+            total_latency[name] = total_latency.get(name, 0) + value
+
+    throughput: List[Dict] = [
+        {"minute": datetime.strptime(minute, "%Y-%m-%dT%H:%M").replace(tzinfo=timezone.utc), **counts}
+        for minute, counts in sorted(minutes.items())
+    ]
+
+    return {
+        "status_count": {s: sum(status_count[t][s] for t in types) for s in statuses},
+        "by_type": {
+            t: {"status_count": status_count[t], "latency": _percentiles(latency[t])}
+            for t in types
+        },
+        "throughput": throughput,
+        "latency": _percentiles(total_latency),
+        "memoization": _memoization(memo["hits"], memo["misses"]),
+        "window_minutes": window_minutes,
+    }
@@ -1,40 +1,102 @@
 # app/main.py
+import json
 import logging
-from typing import List, Optional
+import math
+import time
+from functools import lru_cache
+from typing import List, Optional, Dict
 
-from fastapi import FastAPI, Depends, BackgroundTasks, APIRouter, HTTPException
+from fastapi import FastAPI, Depends, BackgroundTasks, APIRouter, HTTPException, Query, Request, Response, Header
+from fastapi.middleware.gzip import GZipMiddleware
 from sqlalchemy.orm import Session
 
-from app.core import service
-from app.core.config import settings
-from app.core.database import get_db
+from app.core import idempotency, service
+from app.core.config import get_settings
+from app.core.database import get_db, get_read_router
+from app.core.serialization import FastJSONResponse, operation_row_to_dict, operation_rows_response
 from app.models import operation as models
 from app.schemas import operation as schemas
-from app.tasks.worker import process_operation
-
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
-)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Unix time until which the client's reads are pinned to the primary (read-your-writes)
+READ_PRIMARY_COOKIE = "ops_read_primary_until"
+
+
+def get_read_db(request: Request):
+    """Session for read-only routes: the replica, unless it lags or this client just wrote"""
+    try:
+        pinned = float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        pinned = False
+    db = get_read_router().session(prefer_primary=pinned)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored, * matches anything"""
+    if not if_none_match or not etag:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def _overloaded(e: service.OverloadedError) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+def _pin_reads_to_primary(response: Response) -> None:
+    window = get_settings().REPLICA_MAX_LAG_SECONDS
+    response.set_cookie(
+        READ_PRIMARY_COOKIE,
+        str(time.time() + window),
+        max_age=max(math.ceil(window), 1),
+        httponly=True
+    )
+
+
+def _parse_json_filter(name: str, value: Optional[str]) -> Optional[Dict]:
+    if value is None:
+        return None
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"{name} must be a JSON object")
+    if not isinstance(parsed, dict):
+        raise HTTPException(status_code=422, detail=f"{name} must be a JSON object")
+    return parsed
+
 
 @router.post("/operations/", response_model=schemas.Operation)
 async def create_operation(
         operation: schemas.OperationCreate,
         background_tasks: BackgroundTasks,
+        response: Response,
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
         db: Session = Depends(get_db)
 ):
     try:
-        db_operation = service.create_operation(db, operation)
-        background_tasks.add_task(
-            process_operation.apply_async,
-            args=[db_operation.id],
-            priority=0 if db_operation.type == models.OperationType.EXPEDITED else 9
-        )
+        # A retry of an accepted submission gets its original response, never a 429
+        if not service.is_replay(db, idempotency.OPERATION_ENDPOINT, idempotency_key):
+            service.check_admission(db, [operation])
+        if idempotency_key:
+            # Dispatched before responding, so a failed dispatch is retried by the client's retry
+            db_operation, _ = service.create_operation_once(db, operation, idempotency_key)
+        else:
+            db_operation = service.create_operation(db, operation)
+            background_tasks.add_task(service.dispatch_operation, db_operation.id, db_operation.type)
+        _pin_reads_to_primary(response)
         return db_operation
+    except service.OverloadedError as e:
+        raise _overloaded(e)
     except service.ValidationError as e:
         raise HTTPException(status_code=422, detail=str(e))
     except service.ServiceException as e:
@@ -44,9 +106,26 @@ async def create_operation(
 @router.post("/operations/batch/", response_model=schemas.BatchOperationResponse)
 async def create_batch_operations(
         batch: schemas.BatchOperationCreate,
+        response: Response,
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
         db: Session = Depends(get_db)
 ):
-    return service.create_batch_operations(db, batch)
+    shed = {}
+    if not service.is_replay(db, idempotency.BATCH_ENDPOINT, idempotency_key or batch.batch_id):
+        try:
+            shed = service.check_batch_admission(db, batch, idempotency_key)
+        except service.OverloadedError as e:
+            raise _overloaded(e)
+    try:
+        result = service.create_batch_operations(db, batch, idempotency_key, shed=shed)
+    except service.DuplicateBatchError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except service.ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except service.ServiceException as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    _pin_reads_to_primary(response)
+    return result
 
 
 @router.get("/operations/", response_model=List[schemas.OperationOutput])
@@ -55,20 +134,104 @@ async def list_operations(
         limit: int = 100,
         operation_type: Optional[models.OperationType] = None,
         batch_id: Optional[str] = None,
-        db: Session = Depends(get_db)
+        extra_data: Optional[str] = Query(
+            None, description='JSON object the operation extra_data must contain, e.g. {"source": "import"}'
+        ),
+        terms: Optional[str] = Query(
+            None, description='JSON object the operation terms must contain, e.g. {"a": 5}'
+        ),
+        if_none_match: Optional[str] = Header(None),
+        db: Session = Depends(get_read_db)
 ):
+    extra_data_filter = _parse_json_filter("extra_data", extra_data)
+    terms_filter = _parse_json_filter("terms", terms)
     try:
-        result = service.list_operations(db, skip, limit, operation_type, batch_id)
+        if if_none_match:
+            # Version columns only; the full page is loaded only when it changed
+            etag = service.list_operations_etag(
+                db, skip, limit, operation_type, batch_id,
+                extra_data=extra_data_filter, terms=terms_filter
+            )
+            if _etag_matches(if_none_match, etag):
+                return _not_modified(etag)
+        rows = service.list_operation_rows(
+            db, skip, limit, operation_type, batch_id,
+            extra_data=extra_data_filter, terms=terms_filter
+        )
     except Exception as e:
         logger.info(f"Error listing operations: {str(e)}")
         raise e
-    return result
+    # Rows go straight to JSON; response_model only documents the shape
+    response = operation_rows_response(rows)
+    response.headers["ETag"] = service.operation_rows_etag(skip, limit, rows)
+    return response
+
+
+@router.get("/operations/stats", response_model=schemas.OperationStats)
+async def get_operation_stats(
+        window_minutes: int = Query(60, ge=1, le=1440),
+        db: Session = Depends(get_read_db)
+):
+    try:
+        return service.get_operation_stats(db, window_minutes)
+    except service.ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.get("/operations/capacity", response_model=schemas.CapacitySignal)
+async def get_capacity(db: Session = Depends(get_db)):
+    return service.get_capacity(db)
+
+
+@router.post("/operations/bulk-get", response_model=schemas.BulkGetResponse)
+async def bulk_get_operations(request: schemas.BulkGetRequest, db: Session = Depends(get_read_db)):
+    try:
+        rows, missing = service.get_operation_rows_bulk(db, request.ids)
+    except service.ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return FastJSONResponse({
+        "operations": [operation_row_to_dict(row) for row in rows],
+        "missing": missing
+    })
+
+
+@router.post("/operations/bulk-delete", response_model=schemas.BulkDeleteResponse)
+def bulk_delete_operations(
+        request: schemas.BulkDeleteRequest,
+        response: Response,
+        db: Session = Depends(get_db)
+):
+    try:
+        deleted = service.delete_operations(
+            db,
+            operation_ids=request.ids,
+            batch_id=request.batch_id,
+            status=request.status,
+            older_than=request.older_than
+        )
+    except service.ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except service.ServiceException as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    _pin_reads_to_primary(response)
+    return {"deleted": deleted}
 
 
 @router.get("/operations/{operation_id}", response_model=schemas.OperationOutput)
-async def get_operation(operation_id: int, db: Session = Depends(get_db)):
+async def get_operation(
+        operation_id: int,
+        response: Response,
+        if_none_match: Optional[str] = Header(None),
+        db: Session = Depends(get_read_db)
+):
     try:
-        return service.get_operation(db, operation_id)
+        if if_none_match:
+            etag = service.get_operation_etag(db, operation_id)
+            if _etag_matches(if_none_match, etag):
+                return _not_modified(etag)
+        operation = service.get_operation(db, operation_id)
+        response.headers["ETag"] = service.operation_etag(operation)
+        return operation
     except service.OperationNotFoundError:
         raise HTTPException(status_code=404, detail="Operation not found")
     except service.ServiceException as e:
@@ -76,14 +239,66 @@ async def get_operation(operation_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/operations/batch/{batch_id}/status")
-async def get_batch_status(batch_id: str, db: Session = Depends(get_db)):
-    return service.get_batch_status(db, batch_id)
+async def get_batch_status(
+        batch_id: str,
+        if_none_match: Optional[str] = Header(None),
+        db: Session = Depends(get_read_db)
+):
+    # The version query reads only version columns, cheap next to loading every member, so it always runs
+    etag = service.get_batch_status_etag(db, batch_id)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    try:
+        status = service.get_batch_status(db, batch_id)
+    except service.OperationNotFoundError:
+        # Its last members were deleted after the version query
+        raise HTTPException(status_code=404, detail="Batch not found")
+    except service.ServiceException as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return FastJSONResponse(status, headers={"ETag": etag})
+
+
+@router.post("/operations/batch/{batch_id}/cancel", response_model=schemas.BatchCancelResponse)
+def cancel_batch(batch_id: str, response: Response, db: Session = Depends(get_db)):
+    try:
+        result = service.cancel_batch(db, batch_id)
+    except service.OperationNotFoundError:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    except service.ServiceException as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    _pin_reads_to_primary(response)
+    return result
 
 
 @router.delete("/operations/{operation_id}", status_code=200)
-def delete_operation(operation_id: int, db: Session = Depends(get_db)):
+def delete_operation(operation_id: int, response: Response, db: Session = Depends(get_db)):
     service.delete_operation(db, operation_id)
+    _pin_reads_to_primary(response)
     return {"message": "Operation deleted successfully"}
 
 
-app.include_router(router)
+def create_app() -> FastAPI:
+    """Build the API; settings are read here, not when the module is imported"""
+    settings = get_settings()
+    application = FastAPI(
+        title=settings.PROJECT_NAME,
+        openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    )
+    # Compresses responses above the threshold when the client sends Accept-Encoding: gzip
+    application.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE)
+    application.include_router(router)
+    return application
+
+
+@lru_cache
+def get_app() -> FastAPI:
+    return create_app()
+
+
+def __getattr__(name: str):
+    # `uvicorn app.main:app` and `from app.main import app` build the app on first access
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
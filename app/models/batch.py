@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class Batch(Base):
+    """
+    Completion tracking for a batch of operations.
+    Every finished operation bumps completed, failed or cancelled; whoever moves the sum to
+    total also sets finalized_at, which happens exactly once.
+    """
+    __tablename__ = "batches"
+
+    batch_id = Column(String, primary_key=True)
+    total = Column(Integer, nullable=False)
+    completed = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    cancelled = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finalized_at = Column(DateTime(timezone=True), nullable=True)
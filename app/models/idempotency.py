@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+from app.models.operation import JsonDocument
+
+
+class IdempotencyKey(Base):
+    """Client supplied request key -> the response that was returned for it"""
+    __tablename__ = "idempotency_keys"
+
+    # The primary key is the uniqueness guarantee: concurrent retries of the same request
+    # race on this insert and only one of them can commit
+    endpoint = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    response = Column(JsonDocument, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,11 +1,17 @@
 import enum
 
-from sqlalchemy import Column, Integer, String, DateTime, Enum, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Enum, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 
 from app.core.database import Base
 
 
+# JSONB on Postgres so the columns can be GIN indexed and queried with @>,
+# plain JSON on SQLite (used by the test suite)
+JsonDocument = JSONB().with_variant(JSON(), "sqlite")
+
+
 class OperationType(str, enum.Enum):
     REGULAR = "regular"
     EXPEDITED = "expedited"
@@ -16,6 +22,7 @@ class OperationStatus(str, enum.Enum):
     IN_PROGRESS = "in_progress"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 
 class Operation(Base):
@@ -28,7 +35,7 @@ class Operation(Base):
     status = Column(Enum(OperationStatus), default=OperationStatus.PENDING)
 
     # Operation specific fields
-    terms = Column(JSON, nullable=True)  # {"a": number, "b": number}
+    terms = Column(JsonDocument, nullable=True)  # {"a": number, "b": number}
     result = Column(Integer, nullable=True)
 
     # For expedited operations
@@ -36,6 +43,28 @@ class Operation(Base):
     expedited_reason = Column(String, nullable=True)
 
     # Renamed from metadata to extra_data
-    extra_data = Column(JSON, nullable=True)
+    extra_data = Column(JsonDocument, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Set when a worker claims the operation; an IN_PROGRESS row past its lease was abandoned
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        # jsonb_path_ops only supports @>, which is all the containment filters need
+        Index(
+            "ix_operations_extra_data", "extra_data",
+            postgresql_using="gin", postgresql_ops={"extra_data": "jsonb_path_ops"}
+        ),
+        Index(
+            "ix_operations_terms", "terms",
+            postgresql_using="gin", postgresql_ops={"terms": "jsonb_path_ops"}
+        ),
+        # Only rows being worked on carry a live lease, which keeps the reaper's index tiny
+        Index(
+            "ix_operations_lease_expires_at", "lease_expires_at",
+            postgresql_where=status == OperationStatus.IN_PROGRESS.name,
+            sqlite_where=status == OperationStatus.IN_PROGRESS.name
+        ),
+    )
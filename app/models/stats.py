@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, BigInteger
+
+from app.core.database import Base
+
+
+class OperationCounter(Base):
+    """
+    Incrementally maintained rollup counter.
+    scope groups counters ("status", "memo", "minute:<YYYY-MM-DDTHH:MM>"), name is the
+    counter inside the scope (per minute: throughput and "latency:<bucket>" counts).
+    Each counter is spread over a few shards so concurrent workers don't serialize on a
+    single hot row; readers sum the shards.
+    """
+    __tablename__ = "operation_counters"
+
+    scope = Column(String, primary_key=True)
+    type = Column(String, primary_key=True)
+    name = Column(String, primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    value = Column(BigInteger, nullable=False, default=0)
@@ -1,8 +1,9 @@
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Annotated, Optional, List, Dict, Union
 
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
+from app.core import expressions
 from app.models.operation import OperationType, OperationStatus
 
 
@@ -11,6 +12,26 @@ class Terms(BaseModel):
     b: int
 
 
+class ExpressionTerms(BaseModel):
+    """Arithmetic over named integer operands, e.g. {"expression": "(a + b) * c", "operands": {...}}"""
+    expression: str = Field(max_length=1000)
+    operands: Dict[str, Annotated[int, Field(ge=expressions.MIN_VALUE, le=expressions.MAX_VALUE)]] = {}
+
+    @model_validator(mode="after")
+    def validate_expression(self):
+        try:
+            plan = expressions.compile_expression(self.expression)
+        except expressions.ExpressionError as e:
+            raise ValueError(str(e))
+        missing = [name for name in plan.variables if name not in self.operands]
+        if missing:
+            raise ValueError(f"Missing operands: {', '.join(missing)}")
+        return self
+
+
+AnyTerms = Union[Terms, ExpressionTerms]
+
+
 class OperationCreate(BaseModel):
     title: str
     description: Optional[str] = None
@@ -18,21 +39,21 @@ class OperationCreate(BaseModel):
     deadline: Optional[datetime] = None
     expedited_reason: Optional[str] = None
     extra_data: Optional[Dict] = None
-    terms: Terms
+    terms: AnyTerms
 
 
 class Operation(OperationCreate):
     id: int
     status: OperationStatus
-    result: Optional[Dict] = None
+    result: Optional[int] = None
     extra_data: Optional[Dict] = None
 
     @field_validator('terms', check_fields=False)
     def validate_terms(cls, v):
-        if not isinstance(v, (dict, Terms)):
+        if not isinstance(v, (dict, Terms, ExpressionTerms)):
             raise ValueError('Terms must be a dictionary or Terms object')
         if isinstance(v, dict):
-            return Terms(**v)
+            return ExpressionTerms(**v) if expressions.is_expression(v) else Terms(**v)
         return v
 
     class Config:
@@ -56,7 +77,7 @@ class OperationOutput(BaseModel):
     type: OperationType = OperationType.REGULAR
 
     # Operation fields
-    terms: Optional[Terms] = None
+    terms: Optional[AnyTerms] = None
     result: Optional[int] = None
 
     # Optional fields
@@ -85,6 +106,33 @@ class OperationOutput(BaseModel):
         }
 
 
+class BulkGetRequest(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=1000)
+
+
+class BulkGetResponse(BaseModel):
+    operations: List[OperationOutput]
+    missing: List[int]  # requested ids that don't exist
+
+
+class BulkDeleteRequest(BaseModel):
+    """Delete by ids and/or filters; at least one must be given, all given ones must match"""
+    ids: Optional[List[int]] = None
+    batch_id: Optional[str] = Field(None, min_length=1)
+    status: Optional[OperationStatus] = None
+    older_than: Optional[datetime] = None  # created before this moment
+
+    @model_validator(mode="after")
+    def validate_criteria(self):
+        if self.ids is None and self.batch_id is None and self.status is None and self.older_than is None:
+            raise ValueError("Provide ids or at least one of batch_id, status, older_than")
+        return self
+
+
+class BulkDeleteResponse(BaseModel):
+    deleted: int
+
+
 class BatchOperationCreate(BaseModel):
     batch_id: Optional[str] = None
     operations: List[OperationCreate]
@@ -105,3 +153,59 @@ class BatchOperationResponse(BaseModel):
     failed_operations: List[BatchOperationValidationError]
     task_id: Optional[str] = None
     status: str
+
+
+class BatchCancelResponse(BaseModel):
+    batch_id: str
+    cancelled: int  # PENDING operations moved to CANCELLED by this request
+    finalized_at: Optional[datetime] = None  # Set once no operation of the batch is left running
+
+
+class LatencyPercentiles(BaseModel):
+    # Processing latency (created_at -> finished) in seconds, resolved to histogram bucket bounds,
+    # of the operations that finished within the stats window
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p99: Optional[float] = None
+    samples: int = 0
+
+
+class OperationTypeStats(BaseModel):
+    status_count: Dict[OperationStatus, int]
+    latency: LatencyPercentiles
+
+
+class ThroughputBucket(BaseModel):
+    minute: datetime
+    created: int = 0
+    completed: int = 0
+    failed: int = 0
+    abandoned: int = 0  # claimed by a worker that died; reclaimed by the lease reaper
+
+
+class MemoizationStats(BaseModel):
+    hits: int = 0  # operations that reused the result of identical terms
+    misses: int = 0  # operations whose terms were actually evaluated
+    hit_rate: Optional[float] = None
+
+
+class OperationStats(BaseModel):
+    status_count: Dict[OperationStatus, int]
+    by_type: Dict[OperationType, OperationTypeStats]
+    throughput: List[ThroughputBucket]
+    latency: LatencyPercentiles
+    memoization: MemoizationStats
+    window_minutes: int
+
+
+class CapacitySignal(BaseModel):
+    queue_depth: int  # messages waiting on the broker
+    pending: int  # operations in PENDING status
+    backlog: int
+    backlog_limit: int  # regular work is shed at or above this backlog
+    capacity_slots: int  # worker replicas x concurrency
+    finish_rate: float  # operations finished per second, recent
+    accepting_regular: bool
+    retry_after: int  # seconds until the backlog should drop below the limit
+    worker_replicas: int
+    desired_worker_replicas: int
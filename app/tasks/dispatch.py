@@ -0,0 +1,134 @@
+"""
+Task publishing interface.
+The API and service layer hand work to the dispatcher instead of importing Celery tasks,
+so Celery is only imported when something is actually published, and tests or tools
+can swap in the in-process executor.
+"""
+import logging
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from typing import List, NamedTuple, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class DispatchResult(NamedTuple):
+    id: Optional[str]
+
+
+class TaskDispatcher(ABC):
+    @abstractmethod
+    def dispatch_operation(self, operation_id: int, priority: int = 9) -> DispatchResult:
+        """Publish one operation; lower priority values run first"""
+
+    @abstractmethod
+    def dispatch_batch(self, operation_ids: List[int], batch_id: Optional[str] = None) -> DispatchResult:
+        """Publish the operations of a batch"""
+
+    @abstractmethod
+    def queue_depth(self) -> int:
+        """Tasks published but not yet picked up"""
+
+
+class CeleryDispatcher(TaskDispatcher):
+    """Publishes to the broker; app.tasks.worker (and Celery) is imported on first dispatch"""
+
+    def dispatch_operation(self, operation_id: int, priority: int = 9) -> DispatchResult:
+        from app.tasks.worker import get_celery, process_operation
+
+        get_celery()
+        result = process_operation.apply_async(args=[operation_id], priority=priority)
+        return DispatchResult(result.id)
+
+    def dispatch_batch(self, operation_ids: List[int], batch_id: Optional[str] = None) -> DispatchResult:
+        from app.tasks.worker import create_batch_processing_task
+
+        result = create_batch_processing_task(operation_ids, batch_id)
+        return DispatchResult(result.id)
+
+    def queue_depth(self) -> int:
+        from app.tasks.worker import get_celery
+
+        app = get_celery()
+        with app.connection_or_acquire() as connection:
+            # A passive declare reports the message count; on Redis it sums all priority lists
+            queue = connection.default_channel.queue_declare(
+                queue=app.conf.task_default_queue, passive=True
+            )
+            return queue.message_count
+
+
+class InProcessDispatcher(TaskDispatcher):
+    """
+    Runs the task bodies in this process, inline or on the given executor.
+    Priority is ignored; work runs in submission order.
+    """
+
+    def __init__(self, executor: Optional[Executor] = None):
+        self.executor = executor
+        self._queued = 0
+        self._lock = threading.Lock()
+
+    def _submit(self, fn, *args):
+        if self.executor is None:
+            fn(*args)
+            return
+
+        def run():
+            with self._lock:
+                self._queued -= 1
+            return fn(*args)
+
+        with self._lock:
+            self._queued += 1
+        future = self.executor.submit(run)
+        future.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(future):
+        if future.exception() is not None:
+            logger.error(f"In-process task failed: {future.exception()!r}")
+
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def dispatch_operation(self, operation_id: int, priority: int = 9) -> DispatchResult:
+        from app.tasks import processing
+
+        self._submit(processing.process_operation, operation_id)
+        return DispatchResult(str(uuid.uuid4()))
+
+    def dispatch_batch(self, operation_ids: List[int], batch_id: Optional[str] = None) -> DispatchResult:
+        from app.tasks import processing
+
+        for chunk in processing.chunked(list(operation_ids), get_settings().BATCH_CHUNK_SIZE):
+            self._submit(processing.process_operation_chunk, chunk, batch_id)
+        return DispatchResult(str(uuid.uuid4()))
+
+
+_DISPATCHERS = {
+    "celery": CeleryDispatcher,
+    "inprocess": InProcessDispatcher,
+}
+
+_dispatcher: Optional[TaskDispatcher] = None
+
+
+def get_dispatcher() -> TaskDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        name = get_settings().TASK_DISPATCHER
+        if name not in _DISPATCHERS:
+            raise ValueError(f"Unknown TASK_DISPATCHER {name!r}, expected one of {sorted(_DISPATCHERS)}")
+        _dispatcher = _DISPATCHERS[name]()
+    return _dispatcher
+
+
+def set_dispatcher(dispatcher: Optional[TaskDispatcher]) -> None:
+    """Swap the dispatcher (None resets to the configured one)"""
+    global _dispatcher
+    _dispatcher = dispatcher
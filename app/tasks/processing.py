@@ -0,0 +1,434 @@
+"""
+Task bodies, free of any Celery dependency.
+app.tasks.worker wraps them as Celery tasks; the in-process dispatcher calls them directly.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from app.core import batches, expressions, memo, stats
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.models.operation import Operation, OperationStatus, OperationType
+from app.tasks.dispatch import get_dispatcher
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = (OperationStatus.COMPLETED, OperationStatus.FAILED, OperationStatus.CANCELLED)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _claim(operations: List[Operation]) -> datetime:
+    """Mark operations IN_PROGRESS under a fresh lease; returns the lease expiry, which identifies the claim"""
+    lease = _utcnow() + timedelta(seconds=get_settings().OPERATION_LEASE_SECONDS)
+    for operation in operations:
+        operation.status = OperationStatus.IN_PROGRESS
+        operation.lease_expires_at = lease
+        operation.attempts = (operation.attempts or 0) + 1
+    return lease
+
+
+def _still_leased(db, operation_ids: List[int], lease: datetime) -> List[Operation]:
+    """
+    Re-read claimed operations under lock, keeping the ones this claim still holds.
+    If the lease ran out and the reaper requeued an operation, another worker owns it now
+    and this one must not write a result. The lock keeps the reaper off the rows until
+    the results are committed.
+    """
+    if not operation_ids:
+        return []
+    return db.query(Operation).filter(
+        Operation.id.in_(operation_ids),
+        Operation.status == OperationStatus.IN_PROGRESS,
+        Operation.lease_expires_at == lease
+    ).order_by(Operation.id).with_for_update().all()
+
+
+def _vanished(db, operation_ids: List[int]) -> int:
+    """
+    How many of the operations no longer exist. Claimed rows aren't locked between the claim
+    and the result commit, so a bulk delete can remove them; unlike rows reclaimed under
+    another lease (whose new holder counts them), these must still count towards their batch.
+    """
+    if not operation_ids:
+        return 0
+    present = db.query(func.count(Operation.id)).filter(Operation.id.in_(operation_ids)).scalar()
+    return len(operation_ids) - present
+
+
+def _not_found(db, operation_id: int, batch_id: Optional[str]) -> dict:
+    """Count an operation that was deleted as failed, so its batch can still finish"""
+    batch_done = batch_id is not None and batches.record_finished(db, batch_id, failed=1)
+    db.commit()
+    if batch_done:
+        finalize_batch(batch_id)
+    return {"status": "not_found", "operation_id": operation_id}
+
+
+def _lease_lost(db, operation_id: int, batch_id: Optional[str]) -> dict:
+    if _vanished(db, [operation_id]):
+        return _not_found(db, operation_id, batch_id)
+    return {"status": "lease_lost", "operation_id": operation_id}
+
+
+def process_operation(operation_id: int, batch_id: Optional[str] = None) -> dict:
+    """Process a single operation, counting it towards its batch when it finishes"""
+    with SessionLocal() as db:
+        # Locked until the claim commits, so a concurrent batch cancel either sees the claim
+        # or cancels the row first and the task skips it
+        operation = db.query(Operation).filter(Operation.id == operation_id).with_for_update().first()
+        if not operation:
+            # Deleted before it ran
+            return _not_found(db, operation_id, batch_id)
+
+        if operation.status in FINISHED_STATUSES:
+            # Redelivered task, or cancelled before it ran: already counted towards the batch
+            return {"status": operation.status.value, "result": operation.result, "operation_id": operation.id}
+
+        stats.record_transition(db, operation.type, operation.status, OperationStatus.IN_PROGRESS)
+        lease = _claim([operation])
+        logger.info(f"Processing operation {operation_id=}")
+        db.commit()
+
+        try:
+            if not _still_leased(db, [operation_id], lease):
+                return _lease_lost(db, operation_id, batch_id)
+
+            terms = operation.terms
+            cache = memo.get_result_cache()
+            key = memo.terms_key(operation.type, terms)
+            result = cache.get(key)
+            stats.record_memoization(db, operation.type, hits=int(result is not None), misses=int(result is None))
+            if result is None:
+                result = expressions.evaluate_terms(terms)
+                cache.put(key, result)
+            operation.result = result
+            stats.record_finished(
+                db, operation.type, operation.status, OperationStatus.COMPLETED, operation.created_at
+            )
+            operation.status = OperationStatus.COMPLETED
+            operation.lease_expires_at = None
+            batch_done = batch_id is not None and batches.record_finished(db, batch_id, completed=1)
+            logger.info(f"Operation {operation_id}, {terms=} completed with result {operation.result}")
+            db.commit()
+            result = {
+                "status": "completed",
+                "result": operation.result,
+                "operation_id": operation.id
+            }
+
+        except Exception as e:
+            db.rollback()
+            if not _still_leased(db, [operation_id], lease):
+                return _lease_lost(db, operation_id, batch_id)
+            stats.record_finished(
+                db, operation.type, operation.status, OperationStatus.FAILED, operation.created_at
+            )
+            operation.status = OperationStatus.FAILED
+            operation.lease_expires_at = None
+            operation.extra_data = {
+                **(operation.extra_data or {}),
+                "error": str(e),
+                "operation_id": operation.id
+            }
+            batch_done = batch_id is not None and batches.record_finished(db, batch_id, failed=1)
+            db.commit()
+            result = {"status": "failed", "error": str(e), "operation_id": operation.id}
+
+    if batch_done:
+        finalize_batch(batch_id)
+    return result
+
+
+def chunked(operation_ids: List[int], size: int) -> Iterator[List[int]]:
+    for start in range(0, len(operation_ids), size):
+        yield operation_ids[start:start + size]
+
+
+def _evaluate(operations: List[Operation]) -> Dict[int, object]:
+    """
+    Evaluate a set of operations: rows are grouped by compiled plan and each group is
+    evaluated column-wise in one pass. Returns operation id -> result, or the exception
+    for rows that could not be evaluated.
+    """
+    outcomes: Dict[int, object] = {}
+    groups: Dict[expressions.Plan, List[Operation]] = {}
+    for operation in operations:
+        try:
+            groups.setdefault(expressions.plan_for(operation.terms), []).append(operation)
+        except Exception as e:
+            outcomes[operation.id] = e
+
+    for plan, group in groups.items():
+        try:
+            values = expressions.evaluate_batch(plan, [expressions.operands_for(op.terms) for op in group])
+            for operation, value in zip(group, values):
+                try:
+                    outcomes[operation.id] = expressions.check_result(value)
+                except expressions.ExpressionError as e:
+                    # Would fail the chunk's result commit; only this row fails
+                    outcomes[operation.id] = e
+        except Exception:
+            # Some row in the group is bad; evaluate one by one to isolate it
+            for operation in group:
+                try:
+                    outcomes[operation.id] = expressions.evaluate_terms(operation.terms)
+                except Exception as e:
+                    outcomes[operation.id] = e
+    return outcomes
+
+
+def _evaluate_memoized(
+        operations: List[Operation]
+) -> Tuple[Dict[int, object], Dict[OperationType, List[int]]]:
+    """
+    _evaluate with identical terms computed once: rows are grouped by memo.terms_key,
+    groups already in the result cache are answered from it, and one representative per
+    remaining group is evaluated, its outcome fanned out to the whole group.
+    Also returns per-type [hits, misses] counts.
+    """
+    cache = memo.get_result_cache()
+    outcomes: Dict[int, object] = {}
+    groups: Dict[str, List[Operation]] = {}
+    for operation in operations:
+        try:
+            groups.setdefault(memo.terms_key(operation.type, operation.terms), []).append(operation)
+        except Exception as e:
+            outcomes[operation.id] = e
+
+    counts: Dict[OperationType, List[int]] = {}
+    misses: Dict[str, List[Operation]] = {}
+    for key, group in groups.items():
+        op_count = counts.setdefault(group[0].type, [0, 0])
+        result = cache.get(key)
+        if result is None:
+            misses[key] = group
+            op_count[0] += len(group) - 1
+            op_count[1] += 1
+        else:
+            outcomes.update((operation.id, result) for operation in group)
+            op_count[0] += len(group)
+
+    computed = _evaluate([group[0] for group in misses.values()])
+    for key, group in misses.items():
+        outcome = computed[group[0].id]
+        if not isinstance(outcome, Exception):
+            cache.put(key, outcome)
+        outcomes.update((operation.id, outcome) for operation in group)
+    return outcomes, counts
+
+
+def process_operation_chunk(operation_ids: List[int], batch_id: Optional[str] = None) -> dict:
+    """
+    Process several operations of a batch in one pass: one claim commit, batched
+    evaluation per expression plan, one result commit (and one batch counter update).
+    """
+    with SessionLocal() as db:
+        operations = db.query(Operation).filter(
+            Operation.id.in_(operation_ids)
+        ).order_by(Operation.id).with_for_update().all()
+        not_found = len(set(operation_ids)) - len(operations)
+        # Redelivered chunk: operations finished the first time were already counted;
+        # cancelled ones were counted by the cancel and are skipped without any work
+        pending = [op for op in operations if op.status not in FINISHED_STATUSES]
+
+        claimed: Dict[tuple, int] = {}
+        for operation in pending:
+            key = (operation.type, operation.status)
+            claimed[key] = claimed.get(key, 0) + 1
+        for (op_type, old_status), count in claimed.items():
+            stats.record_transition(db, op_type, old_status, OperationStatus.IN_PROGRESS, count)
+        lease = _claim(pending)
+        db.commit()
+
+        # One query reloads the claimed rows (expired by the commit) and drops any that were reaped
+        claimed_ids = [operation.id for operation in pending]
+        pending = _still_leased(db, claimed_ids, lease)
+        held = {operation.id for operation in pending}
+        not_found += _vanished(db, [operation_id for operation_id in claimed_ids if operation_id not in held])
+
+        outcomes, memo_counts = _evaluate_memoized(pending)
+        for op_type, (hits, misses) in memo_counts.items():
+            stats.record_memoization(db, op_type, hits, misses)
+        finished: Dict[tuple, list] = {}
+        for operation in pending:
+            outcome = outcomes[operation.id]
+            operation.lease_expires_at = None
+            if isinstance(outcome, Exception):
+                operation.status = OperationStatus.FAILED
+                operation.extra_data = {
+                    **(operation.extra_data or {}),
+                    "error": str(outcome),
+                    "operation_id": operation.id
+                }
+            else:
+                operation.result = outcome
+                operation.status = OperationStatus.COMPLETED
+            finished.setdefault((operation.type, operation.status), []).append(operation.created_at)
+
+        for (op_type, status), created_ats in finished.items():
+            stats.record_finished_many(db, op_type, OperationStatus.IN_PROGRESS, status, created_ats)
+
+        failed = sum(1 for op in pending if op.status == OperationStatus.FAILED)
+        completed = len(pending) - failed
+        batch_done = batch_id is not None and batches.record_finished(
+            db, batch_id, completed=completed, failed=failed + not_found
+        )
+        db.commit()
+
+    logger.info(f"Processed chunk of {len(operation_ids)} operations: {completed=} {failed=} {not_found=}")
+    if batch_done:
+        finalize_batch(batch_id)
+    return {"completed": completed, "failed": failed, "not_found": not_found}
+
+
+def reap_expired_leases(limit: Optional[int] = None) -> dict:
+    """
+    Reclaim IN_PROGRESS operations whose lease expired because their worker died.
+    Up to `limit` of them (served by the partial index on lease_expires_at) are moved back
+    to PENDING and republished, or failed once they used up LEASE_MAX_ATTEMPTS claims.
+    The ones whose republish fails stay reclaimable by the next run. Rows locked by a live
+    worker are skipped. Returns the counts and the worker time lost
+    to the abandoned leases.
+    """
+    settings = get_settings()
+    limit = limit or settings.LEASE_REAPER_BATCH_SIZE
+    now = _utcnow()
+
+    with SessionLocal() as db:
+        expired = db.query(Operation).filter(
+            Operation.status == OperationStatus.IN_PROGRESS,
+            Operation.lease_expires_at < now
+        ).order_by(Operation.lease_expires_at).limit(limit).with_for_update(skip_locked=True).all()
+        if not expired:
+            return {"requeued": 0, "failed": 0, "lost_seconds": 0.0}
+
+        lost_seconds = 0.0
+        abandoned: Dict[OperationType, int] = {}
+        requeued: Dict[Optional[str], List[Operation]] = {}
+        requeued_types: Dict[OperationType, int] = {}
+        exhausted: Dict[OperationType, list] = {}
+        failed_by_batch: Dict[str, int] = {}
+        for operation in expired:
+            lease = operation.lease_expires_at
+            if lease.tzinfo is None:
+                # SQLite hands back naive UTC timestamps
+                lease = lease.replace(tzinfo=timezone.utc)
+            # The worker held the row from its claim until now without finishing it
+            lost_seconds += (now - lease).total_seconds() + settings.OPERATION_LEASE_SECONDS
+            abandoned[operation.type] = abandoned.get(operation.type, 0) + 1
+
+            operation.lease_expires_at = None
+            batch_id = (operation.extra_data or {}).get("batch_id")
+            if operation.attempts < settings.LEASE_MAX_ATTEMPTS:
+                operation.status = OperationStatus.PENDING
+                requeued.setdefault(batch_id, []).append(operation)
+                requeued_types[operation.type] = requeued_types.get(operation.type, 0) + 1
+            else:
+                operation.status = OperationStatus.FAILED
+                operation.extra_data = {
+                    **(operation.extra_data or {}),
+                    "error": f"Abandoned by its worker {operation.attempts} times",
+                    "operation_id": operation.id
+                }
+                exhausted.setdefault(operation.type, []).append(operation.created_at)
+                if batch_id:
+                    failed_by_batch[batch_id] = failed_by_batch.get(batch_id, 0) + 1
+
+        for op_type, count in abandoned.items():
+            stats.record_abandoned(db, op_type, count)
+        for op_type, count in requeued_types.items():
+            stats.record_transition(db, op_type, OperationStatus.IN_PROGRESS, OperationStatus.PENDING, count)
+        for op_type, created_ats in exhausted.items():
+            stats.record_finished_many(db, op_type, OperationStatus.IN_PROGRESS, OperationStatus.FAILED, created_ats)
+        finalized = [
+            batch_id for batch_id, failed in failed_by_batch.items()
+            if batches.record_finished(db, batch_id, failed=failed)
+        ]
+        republish = {
+            batch_id: [(operation.id, operation.type) for operation in group]
+            for batch_id, group in requeued.items()
+        }
+        db.commit()
+
+    dispatcher = get_dispatcher()
+    undispatched: List[Tuple[int, OperationType]] = []
+    for batch_id, operations in republish.items():
+        try:
+            if batch_id:
+                dispatcher.dispatch_batch([operation_id for operation_id, _ in operations], batch_id)
+                continue
+        except Exception:
+            logger.exception(f"Could not republish {len(operations)} reclaimed operations of batch {batch_id}")
+            undispatched.extend(operations)
+            continue
+        for operation_id, op_type in operations:
+            try:
+                dispatcher.dispatch_operation(
+                    operation_id, priority=0 if op_type == OperationType.EXPEDITED else 9
+                )
+            except Exception:
+                logger.exception(f"Could not republish reclaimed operation {operation_id}")
+                undispatched.append((operation_id, op_type))
+    if undispatched:
+        _expire_undispatched(undispatched, now)
+    for batch_id in finalized:
+        finalize_batch(batch_id)
+
+    summary = {
+        "requeued": sum(len(operations) for operations in republish.values()) - len(undispatched),
+        "failed": sum(len(created_ats) for created_ats in exhausted.values()),
+        "lost_seconds": lost_seconds
+    }
+    logger.warning(f"Reclaimed {len(expired)} abandoned operations: {summary}")
+    return summary
+
+
+def _expire_undispatched(operations: List[Tuple[int, OperationType]], lease: datetime) -> None:
+    """
+    Put requeued operations whose republish failed back under an expired lease. A PENDING row
+    without a task would never run, and the reaper only looks at IN_PROGRESS rows; this way
+    its next run picks them up again.
+    """
+    with SessionLocal() as db:
+        by_type: Dict[OperationType, List[int]] = {}
+        for operation_id, op_type in operations:
+            by_type.setdefault(op_type, []).append(operation_id)
+        for op_type, operation_ids in by_type.items():
+            expired = db.query(Operation).filter(
+                Operation.id.in_(operation_ids),
+                Operation.status == OperationStatus.PENDING,
+                Operation.lease_expires_at.is_(None)
+            ).update(
+                {Operation.status: OperationStatus.IN_PROGRESS, Operation.lease_expires_at: lease},
+                synchronize_session=False
+            )
+            stats.record_transition(db, op_type, OperationStatus.PENDING, OperationStatus.IN_PROGRESS, expired)
+        db.commit()
+
+
+def prune_stats() -> int:
+    """Drop per-minute rollup counters past STATS_MINUTE_RETENTION_MINUTES"""
+    with SessionLocal() as db:
+        deleted = stats.prune_minute_counters(db, get_settings().STATS_MINUTE_RETENTION_MINUTES)
+        db.commit()
+    logger.info(f"Pruned {deleted} per-minute stats counters")
+    return deleted
+
+
+def finalize_batch(batch_id: str) -> dict:
+    """Runs exactly once per batch, after its last operation finished"""
+    with SessionLocal() as db:
+        batch = batches.get(db, batch_id)
+        summary = {
+            "batch_id": batch_id,
+            "batch_completed_at": batch.finalized_at.isoformat() if batch.finalized_at else None,
+            "results": {"completed": batch.completed, "failed": batch.failed}
+        }
+    logger.info(f"Batch {batch_id} finished: {summary['results']}")
+    return summary
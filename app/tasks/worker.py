@@ -1,115 +1,95 @@
 import logging
-from datetime import datetime
+from functools import lru_cache
 
-from celery import Celery, group, chord
+from typing import Optional
+
+from celery import Celery, group, shared_task
 from celery.result import GroupResult
 
-from app.core.config import settings
-from app.core.database import SessionLocal
-from app.models.operation import Operation, OperationStatus
-
-celery = Celery(
-    "worker",
-    broker=settings.CELERY_BROKER_URL,
-    backend=settings.CELERY_RESULT_BACKEND
-)
-
-# Configure Celery for handling large results
-celery.conf.update(
-    result_extended=True,
-    result_expires=60,  # Results expire in 1 minute
-    task_track_started=True,
-    task_serializer='json',
-    result_serializer='json',
-    accept_content=['json']
-)
+from app.core.config import get_settings
+from app.tasks import processing
 
 logger = logging.getLogger(__name__)
 
 
-@celery.task(bind=True, name='tasks.process_operation')
-def process_operation(self, operation_id: int) -> dict:
-    """Process a single operation"""
-    with SessionLocal() as db:
-        operation = db.query(Operation).get(operation_id)
-        if not operation:
-            return {"status": "not_found"}
-
-        try:
-            operation.status = OperationStatus.IN_PROGRESS
-            logger.info(f"Processing operation {operation_id=}")
-            db.commit()
-
-            # Perform the addition
-            terms = operation.terms
-            operation.result = terms['a'] + terms['b']
-            operation.status = OperationStatus.COMPLETED
-            logger.info(f"Operation {operation_id}, {terms=} completed with result {operation.result}")
-            db.commit()
-
-            return {
-                "status": "completed",
-                "result": operation.result,
-                "operation_id": operation.id
-            }
-
-        except Exception as e:
-            operation.status = OperationStatus.FAILED
-            operation.extra_data = {
-                **(operation.extra_data or {}),
-                "error": str(e),
-                "operation_id": operation.id
-            }
-            db.commit()
-            return {"status": "failed", "error": str(e)}
-
-
-@celery.task(name='tasks.process_batch_callback')
-def process_batch_callback(results):
-    """Callback task that runs after all operations in a batch are completed"""
-    with SessionLocal() as db:
-        # Group results by status
-        status_count = {
-            "completed": 0,
-            "failed": 0,
-            "not_found": 0
-        }
-        for result in results:
-            status_count[result['status']] += 1
-
-            # Update operation with batch completion info
-            operation = db.query(Operation).get(result['operation_id'])
-            if operation:
-                operation.extra_data = {
-                    **(operation.extra_data or {}),
-                    "batch_completion_time": datetime.utcnow().isoformat(),
-                    "batch_result": result
-                }
-
-        db.commit()
-
-        return {
-            "batch_completed_at": datetime.utcnow().isoformat(),
-            "results": status_count
+@lru_cache
+def get_celery() -> Celery:
+    """
+    Build the Celery app on first use.
+    `celery -A app.tasks.worker` resolves the `celery` attribute below, which lands here.
+    """
+    settings = get_settings()
+    celery = Celery(
+        "worker",
+        broker=settings.CELERY_BROKER_URL,
+        backend=settings.CELERY_RESULT_BACKEND
+    )
+
+    # Configure Celery for handling large results
+    celery.conf.update(
+        result_extended=True,
+        result_expires=60,  # Results expire in 1 minute
+        task_track_started=True,
+        task_serializer='json',
+        result_serializer='json',
+        accept_content=['json'],
+        # Run by `celery -A app.tasks.worker beat`
+        beat_schedule={
+            'reap-expired-leases': {
+                'task': 'tasks.reap_expired_leases',
+                'schedule': settings.LEASE_REAPER_INTERVAL_SECONDS,
+            },
+            'prune-stats': {
+                'task': 'tasks.prune_stats',
+                'schedule': settings.STATS_PRUNE_INTERVAL_SECONDS,
+            },
         }
+    )
+    return celery
+
 
+def __getattr__(name: str):
+    if name == "celery":
+        return get_celery()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-def create_batch_processing_task(operation_ids: list[int]) -> GroupResult:
+
+# Progress lives in the operations and batches tables, so task results are never stored
+@shared_task(bind=True, name='tasks.process_operation', ignore_result=True)
+def process_operation(self, operation_id: int, batch_id: Optional[str] = None) -> dict:
+    """Process a single operation"""
+    return processing.process_operation(operation_id, batch_id)
+
+
+@shared_task(name='tasks.process_operation_chunk', ignore_result=True)
+def process_operation_chunk(operation_ids: list[int], batch_id: Optional[str] = None) -> dict:
+    """Process a chunk of a batch in one pass"""
+    return processing.process_operation_chunk(operation_ids, batch_id)
+
+
+@shared_task(name='tasks.reap_expired_leases', ignore_result=True)
+def reap_expired_leases() -> dict:
+    """Requeue operations abandoned by dead workers"""
+    return processing.reap_expired_leases()
+
+
+@shared_task(name='tasks.prune_stats', ignore_result=True)
+def prune_stats() -> int:
+    """Delete per-minute stats counters past their retention"""
+    return processing.prune_stats()
+
+
+def create_batch_processing_task(operation_ids: list[int], batch_id: Optional[str] = None) -> GroupResult:
     """
-    Create a distributed batch processing task using Celery chord
-    Returns a GroupResult that can be used to track the batch progress
+    Publish the batch as chunks of BATCH_CHUNK_SIZE operations.
+    There is no chord: each chunk counts itself towards the batch row and the one that
+    completes it finalizes the batch (see app.core.batches), so nothing waits on the
+    result backend.
     """
-    # Create a group of tasks for parallel processing
-    operation_tasks = group(
-        process_operation.s(op_id) for op_id in operation_ids
-    )
+    get_celery()
 
-    # Create a chord that will execute the callback after all operations are done
-    batch_chord = chord(
-        operation_tasks,
-        process_batch_callback.s()
+    chunk_tasks = group(
+        process_operation_chunk.s(chunk, batch_id)
+        for chunk in processing.chunked(operation_ids, get_settings().BATCH_CHUNK_SIZE)
     )
-
-    # Execute the chord
-    result = batch_chord.apply_async()
-    return result
+    return chunk_tasks.apply_async()
@@ -1,9 +1,13 @@
+from unittest.mock import patch
+
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
+from app.core import idempotency, memo
 from app.core.database import Base
 from app.models.operation import OperationType
+from app.tasks import dispatch
 
 # Create an in-memory SQLite database for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -26,6 +30,21 @@ def db_session():
     finally:
         db.close()
         Base.metadata.drop_all(bind=engine)
+        # Recently stored responses belong to the database that was just dropped
+        idempotency.clear_cache()
+        memo.get_result_cache().clear()
+
+
+@pytest.fixture
+def worker(db_session):
+    """Task bodies run against the test database; published work runs inline"""
+    worker_sessions = sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+    dispatcher = dispatch.InProcessDispatcher()
+    dispatch.set_dispatcher(dispatcher)
+    with patch('app.tasks.processing.SessionLocal', worker_sessions):
+        yield dispatcher
+    dispatch.set_dispatcher(None)
+
 
 @pytest.fixture
 def sample_operation_data():
@@ -0,0 +1,329 @@
+"""
+Soak / load harness: the API, the broker and the workers under concurrency, in one process.
+
+The FastAPI app is driven through TestClient by a pool of client threads. Published work goes
+through the Celery publish path (task wrappers, chunk groups) to a Celery worker consuming an
+in-memory broker (--mode celery, the default), or straight to an InProcessDispatcher backed
+by a thread pool (--mode inprocess). A watcher records when each submitted operation reaches
+a final status. Defaults to a throwaway SQLite file; pass --database-url to soak a real Postgres.
+
+    python -m tests.load.soak --duration 60 --clients 8 --workers 4
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.main import get_app, get_db, get_read_db
+from app.models.operation import Operation, OperationStatus
+from app.tasks import dispatch
+
+FINAL_STATUSES = (OperationStatus.COMPLETED, OperationStatus.FAILED, OperationStatus.CANCELLED)
+PERCENTILES = (50, 90, 99)
+
+# Relative weights of the request kinds in the mixed workload
+DEFAULT_MIX = {"create": 40, "batch": 5, "poll": 40, "list": 15}
+MODES = ("celery", "inprocess")
+
+
+@dataclass
+class SoakConfig:
+    duration: float = 30.0
+    clients: int = 8
+    workers: int = 4
+    mode: str = "celery"
+    batch_size: int = 50
+    mix: Dict[str, int] = field(default_factory=lambda: dict(DEFAULT_MIX))
+    drain_timeout: float = 30.0
+    database_url: Optional[str] = None
+    seed: Optional[int] = None
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    """Nearest-rank percentiles, in milliseconds"""
+    ordered = sorted(samples)
+    result: Dict[str, Optional[float]] = {}
+    for p in PERCENTILES:
+        if not ordered:
+            result[f"p{p}"] = None
+            continue
+        rank = max(int(round(p / 100 * len(ordered))) - 1, 0)
+        result[f"p{p}"] = round(ordered[min(rank, len(ordered) - 1)] * 1000, 2)
+    return result
+
+
+class _Recorder:
+    """Request outcomes and operation submit/finish times, shared by all threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.shed: Dict[str, int] = {}
+        self.submitted: Dict[int, float] = {}
+        self.finished: Dict[int, float] = {}
+        self.final_status: Dict[int, OperationStatus] = {}
+
+    def request(self, kind: str, seconds: float, status_code: Optional[int]) -> None:
+        with self._lock:
+            self.latencies.setdefault(kind, []).append(seconds)
+            if status_code == 429:
+                self.shed[kind] = self.shed.get(kind, 0) + 1
+            elif status_code is None or status_code >= 400:
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def submit(self, operation_ids: List[int]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for operation_id in operation_ids:
+                self.submitted[operation_id] = now
+
+    def outstanding(self) -> List[int]:
+        with self._lock:
+            return [i for i in self.submitted if i not in self.finished]
+
+    def known_ids(self) -> List[int]:
+        with self._lock:
+            return list(self.submitted)
+
+    def finish(self, rows) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for operation_id, status in rows:
+                self.finished.setdefault(operation_id, now)
+                self.final_status[operation_id] = status
+
+
+def _client_loop(app, config: SoakConfig, recorder: _Recorder, deadline: float, rng: random.Random) -> None:
+    kinds = list(config.mix)
+    weights = [config.mix[kind] for kind in kinds]
+    client = TestClient(app)
+    while time.monotonic() < deadline:
+        kind = rng.choices(kinds, weights)[0]
+        known = recorder.known_ids()
+        if kind == "poll" and not known:
+            kind = "create"
+        terms = {"a": rng.randint(0, 1000), "b": rng.randint(0, 1000)}
+        started = time.monotonic()
+        status_code = None
+        try:
+            if kind == "create":
+                response = client.post("/operations/", json={"title": "soak", "type": "regular", "terms": terms})
+                if response.status_code == 200:
+                    recorder.submit([response.json()["id"]])
+            elif kind == "batch":
+                response = client.post("/operations/batch/", json={"operations": [
+                    {"title": "soak", "type": "regular", "terms": {"a": rng.randint(0, 50), "b": 1}}
+                    for _ in range(config.batch_size)
+                ]})
+                if response.status_code == 200:
+                    recorder.submit(response.json()["successful_operations"])
+            elif kind == "poll":
+                response = client.get(f"/operations/{rng.choice(known)}")
+            else:
+                response = client.get("/operations/", params={"skip": rng.randint(0, 1000), "limit": 50})
+            status_code = response.status_code
+        except Exception:
+            pass
+        recorder.request(kind, time.monotonic() - started, status_code)
+
+
+def _watch(sessions: sessionmaker, recorder: _Recorder, stop: threading.Event, interval: float = 0.05) -> None:
+    """Poll the database for submitted operations that reached a final status"""
+    while not stop.is_set():
+        outstanding = recorder.outstanding()
+        for start in range(0, len(outstanding), 500):
+            with sessions() as db:
+                rows = db.query(Operation.id, Operation.status).filter(
+                    Operation.id.in_(outstanding[start:start + 500]),
+                    Operation.status.in_(FINAL_STATUSES)
+                ).all()
+            recorder.finish(rows)
+        stop.wait(interval)
+
+
+def _engine(database_url: Optional[str]):
+    if database_url:
+        return create_engine(database_url, pool_size=32, max_overflow=16), None
+    path = os.path.join(tempfile.mkdtemp(prefix="soak-"), "soak.db")
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False, "timeout": 30}
+    )
+
+    @event.listens_for(engine, "connect")
+    def _wal(connection, _):
+        # Readers don't block the writer (and vice versa)
+        connection.execute("PRAGMA journal_mode=WAL")
+
+    return engine, path
+
+
+@contextmanager
+def _celery_workers(workers: int) -> Iterator[dispatch.TaskDispatcher]:
+    """The production publish path, consumed by a threaded Celery worker over an in-memory broker"""
+    from celery.contrib.testing.worker import start_worker
+
+    from app.tasks.worker import get_celery
+
+    celery = get_celery()
+    celery.conf.update(
+        broker_url="memory://",
+        result_backend="cache+memory://",
+        # The virtual transport polls for messages; the default 1s would dominate completion latency
+        broker_transport_options={"polling_interval": 0.01}
+    )
+    with start_worker(celery, pool="threads", concurrency=workers, perform_ping_check=False, loglevel="WARNING"):
+        yield dispatch.CeleryDispatcher()
+
+
+@contextmanager
+def _in_process_workers(workers: int) -> Iterator[dispatch.TaskDispatcher]:
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="soak-worker")
+    try:
+        yield dispatch.InProcessDispatcher(executor)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def run(config: SoakConfig) -> Dict:
+    """Run the workload for config.duration seconds, wait for the work to drain and report"""
+    unknown = set(config.mix) - set(DEFAULT_MIX)
+    if unknown:
+        raise ValueError(f"Unknown request kinds {sorted(unknown)}, expected some of {sorted(DEFAULT_MIX)}")
+    if config.mode not in MODES:
+        raise ValueError(f"Unknown mode {config.mode!r}, expected one of {MODES}")
+    rng = random.Random(config.seed)
+    engine, path = _engine(config.database_url)
+    Base.metadata.create_all(bind=engine)
+    sessions = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def session_dependency():
+        db = sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    recorder = _Recorder()
+    workers = _celery_workers if config.mode == "celery" else _in_process_workers
+    stop = threading.Event()
+    watcher = threading.Thread(target=_watch, args=(sessions, recorder, stop), daemon=True)
+
+    app = get_app()
+    app.dependency_overrides[get_db] = session_dependency
+    app.dependency_overrides[get_read_db] = session_dependency
+    try:
+        with patch("app.tasks.processing.SessionLocal", sessions), workers(config.workers) as dispatcher:
+            dispatch.set_dispatcher(dispatcher)
+            watcher.start()
+            started = time.monotonic()
+            deadline = started + config.duration
+            with ThreadPoolExecutor(max_workers=config.clients, thread_name_prefix="soak-client") as clients:
+                for _ in range(config.clients):
+                    clients.submit(_client_loop, app, config, recorder, deadline, random.Random(rng.random()))
+            load_seconds = time.monotonic() - started
+
+            drain_deadline = time.monotonic() + config.drain_timeout
+            while recorder.outstanding() and time.monotonic() < drain_deadline:
+                time.sleep(0.05)
+            stop.set()
+            watcher.join()
+    finally:
+        stop.set()
+        dispatch.set_dispatcher(None)
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_read_db, None)
+        engine.dispose()
+
+    return {"mode": config.mode, **_report(recorder, load_seconds, path)}
+
+
+def _report(recorder: _Recorder, load_seconds: float, database_path: Optional[str]) -> Dict:
+    requests = {
+        kind: {
+            "count": len(samples),
+            "errors": recorder.errors.get(kind, 0),
+            "shed": recorder.shed.get(kind, 0),
+            "error_rate": recorder.errors.get(kind, 0) / len(samples),
+            "latency_ms": percentiles(samples),
+        }
+        for kind, samples in sorted(recorder.latencies.items())
+    }
+    total_requests = sum(entry["count"] for entry in requests.values())
+    total_errors = sum(entry["errors"] for entry in requests.values())
+
+    completion = [recorder.finished[i] - recorder.submitted[i] for i in recorder.finished]
+    statuses: Dict[str, int] = {}
+    for status in recorder.final_status.values():
+        statuses[status.value] = statuses.get(status.value, 0) + 1
+    last_finish = max(recorder.finished.values(), default=None)
+    first_submit = min(recorder.submitted.values(), default=None)
+    busy_seconds = (last_finish - first_submit) if last_finish and first_submit else 0.0
+
+    return {
+        "load_seconds": round(load_seconds, 2),
+        "requests": requests,
+        "request_throughput": round(total_requests / load_seconds, 2) if load_seconds else 0.0,
+        "error_rate": total_errors / total_requests if total_requests else 0.0,
+        "operations": {
+            "submitted": len(recorder.submitted),
+            "finished": len(recorder.finished),
+            "unfinished": len(recorder.submitted) - len(recorder.finished),
+            "final_status": statuses,
+            # Sustained rate: finished operations over the time from first submit to last finish
+            "throughput": round(len(recorder.finished) / busy_seconds, 2) if busy_seconds else 0.0,
+            "completion_latency_ms": percentiles(completion),
+        },
+        "database": database_path,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=SoakConfig.duration, help="seconds of load")
+    parser.add_argument("--clients", type=int, default=SoakConfig.clients, help="concurrent API clients")
+    parser.add_argument("--workers", type=int, default=SoakConfig.workers, help="worker threads")
+    parser.add_argument(
+        "--mode", choices=MODES, default=SoakConfig.mode,
+        help="celery: Celery worker on an in-memory broker; inprocess: InProcessDispatcher"
+    )
+    parser.add_argument("--batch-size", type=int, default=SoakConfig.batch_size)
+    parser.add_argument(
+        "--mix", type=json.loads, default=DEFAULT_MIX,
+        help=f"JSON weights of the request kinds, default {json.dumps(DEFAULT_MIX)}"
+    )
+    parser.add_argument("--drain-timeout", type=float, default=SoakConfig.drain_timeout)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    report = run(SoakConfig(
+        duration=args.duration,
+        clients=args.clients,
+        workers=args.workers,
+        mode=args.mode,
+        batch_size=args.batch_size,
+        mix=args.mix,
+        drain_timeout=args.drain_timeout,
+        database_url=args.database_url,
+        seed=args.seed,
+    ))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import pytest
+
+from tests.load import soak
+
+
+@pytest.mark.parametrize("mode", soak.MODES)
+def test_soak_smoke(mode):
+    report = soak.run(soak.SoakConfig(duration=1.0, clients=2, workers=2, batch_size=10, seed=7, mode=mode))
+
+    assert report["error_rate"] == 0.0
+    assert report["operations"]["submitted"] > 0
+    assert report["operations"]["unfinished"] == 0
+    assert report["operations"]["final_status"] == {"completed": report["operations"]["submitted"]}
+    assert report["operations"]["completion_latency_ms"]["p50"] is not None
+
+
+def test_percentiles():
+    assert soak.percentiles([]) == {"p50": None, "p90": None, "p99": None}
+    assert soak.percentiles([i / 1000 for i in range(1, 101)]) == {"p50": 50.0, "p90": 90.0, "p99": 99.0}
+
+
+def test_unknown_request_kind_is_rejected():
+    with pytest.raises(ValueError):
+        soak.run(soak.SoakConfig(duration=0, mix={"upload": 1}))
+    with pytest.raises(ValueError):
+        soak.run(soak.SoakConfig(duration=0, mode="threads"))
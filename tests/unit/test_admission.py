@@ -0,0 +1,92 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from app.core import service
+from app.core.admission import AdmissionController, CapacitySnapshot
+from app.models.operation import Operation, OperationType
+from app.schemas.operation import BatchOperationCreate, OperationCreate
+
+
+def _controller(queue_depth=0):
+    # 1 replica x 2 slots x 2 per slot: regular work is shed from a backlog of 4
+    return AdmissionController(
+        worker_replicas=1,
+        worker_concurrency=2,
+        max_backlog_per_slot=2,
+        check_interval=0,
+        queue_depth_probe=lambda: queue_depth
+    )
+
+
+def test_regular_work_shed_over_capacity(db_session, sample_operation_data):
+    controller = _controller()
+    for _ in range(3):
+        service.create_operation(db_session, OperationCreate(**sample_operation_data))
+    assert controller.admit(db_session, regular=1) == 0
+
+    service.create_operation(db_session, OperationCreate(**sample_operation_data))
+    assert controller.admit(db_session, regular=1) > 0
+    # Expedited-only submissions are always admitted
+    assert controller.admit(db_session, regular=0) == 0
+
+
+def test_broker_queue_depth_counts_as_backlog(db_session):
+    assert _controller(queue_depth=10).admit(db_session, regular=1) > 0
+
+
+def test_failing_queue_probe_does_not_block(db_session):
+    def broken_probe():
+        raise ConnectionError("broker down")
+
+    controller = AdmissionController(1, 2, 2, check_interval=0, queue_depth_probe=broken_probe)
+    assert controller.admit(db_session, regular=1) == 0
+
+
+def test_retry_after_uses_finish_rate():
+    snapshot = CapacitySnapshot(
+        queue_depth=0, pending=120, worker_replicas=1, worker_concurrency=2,
+        backlog_limit=100, finish_rate=10.0
+    )
+    assert not snapshot.accepting_regular
+    assert snapshot.retry_after(30) == 5
+
+
+def test_check_admission_raises_overloaded(db_session, sample_operation_data):
+    with patch('app.core.admission.get_admission_controller', return_value=_controller(queue_depth=10)):
+        with pytest.raises(service.OverloadedError) as error:
+            service.check_admission(db_session, [OperationCreate(**sample_operation_data)])
+        assert error.value.retry_after > 0
+
+        expedited = dict(sample_operation_data, type=OperationType.EXPEDITED)
+        service.check_admission(db_session, [OperationCreate(**expedited)])
+
+
+@patch('app.core.service.create_batch_processing_task')
+def test_mixed_batch_sheds_only_regular_operations(mock_create_batch_task, db_session, sample_operation_data):
+    mock_create_batch_task.return_value.id = "mocked-task-id"
+    expedited = dict(sample_operation_data, type=OperationType.EXPEDITED, deadline=datetime.utcnow())
+    batch = BatchOperationCreate(operations=[
+        OperationCreate(**sample_operation_data), OperationCreate(**expedited)
+    ])
+
+    with patch('app.core.admission.get_admission_controller', return_value=_controller(queue_depth=10)):
+        shed = service.check_batch_admission(db_session, batch)
+        assert list(shed) == [0]
+        with pytest.raises(service.OverloadedError):
+            service.check_batch_admission(db_session, BatchOperationCreate(operations=batch.operations[:1]))
+        with pytest.raises(service.OverloadedError):
+            service.check_batch_admission(db_session, BatchOperationCreate(operations=batch.operations, atomic=True))
+        # A keyed batch would replay its shed operations as failed on every retry
+        with pytest.raises(service.OverloadedError):
+            service.check_batch_admission(db_session, batch, idempotency_key="mixed-key")
+        with pytest.raises(service.OverloadedError):
+            service.check_batch_admission(db_session, BatchOperationCreate(
+                operations=batch.operations, batch_id="mixed-batch"
+            ))
+
+    response = service.create_batch_operations(db_session, batch, shed=shed)
+    assert len(response.successful_operations) == 1
+    assert [failure.index for failure in response.failed_operations] == [0]
+    assert db_session.query(Operation).one().type == OperationType.EXPEDITED
@@ -0,0 +1,70 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.core import batches, service
+from app.models.operation import OperationStatus
+from app.schemas.operation import BatchOperationCreate, OperationCreate
+from app.tasks import processing
+
+
+def test_batch_finalizes_exactly_once(db_session):
+    batches.create(db_session, "counted-batch", total=3)
+    db_session.commit()
+
+    finalized = [
+        batches.record_finished(db_session, "counted-batch", completed=1),
+        batches.record_finished(db_session, "counted-batch", failed=1),
+        batches.record_finished(db_session, "counted-batch", completed=1),
+        # A stray extra count after completion must not finalize again
+        batches.record_finished(db_session, "counted-batch", completed=1),
+    ]
+    db_session.commit()
+
+    assert finalized == [False, False, True, False]
+    batch = batches.get(db_session, "counted-batch")
+    assert (batch.completed, batch.failed) == (3, 1)
+    assert batch.finalized_at is not None
+
+
+def test_unknown_batch_is_ignored(db_session):
+    assert batches.record_finished(db_session, "no-such-batch", completed=1) is False
+
+
+def test_missing_operation_counts_towards_batch(worker, db_session):
+    batches.create(db_session, "deleted-batch", total=1)
+    db_session.commit()
+
+    result = processing.process_operation(12345, "deleted-batch")
+
+    assert result["status"] == "not_found"
+    db_session.expire_all()
+    batch = batches.get(db_session, "deleted-batch")
+    assert batch.failed == 1
+    assert batch.finalized_at is not None
+
+
+@patch('app.core.service.create_batch_processing_task')
+def test_cancel_batch_skips_remaining_work(mock_create_batch_task, worker, db_session, sample_operation_data):
+    mock_create_batch_task.return_value.id = "mocked-task-id"
+    response = service.create_batch_operations(db_session, BatchOperationCreate(
+        operations=[OperationCreate(**sample_operation_data) for _ in range(3)],
+        batch_id="cancelled-batch"
+    ))
+    ids = response.successful_operations
+
+    processing.process_operation(ids[0], "cancelled-batch")
+    result = service.cancel_batch(db_session, "cancelled-batch")
+    # Tasks still queued for the cancelled operations do nothing
+    assert processing.process_operation_chunk(ids[1:], "cancelled-batch")["completed"] == 0
+
+    assert result["cancelled"] == 2
+    assert result["finalized_at"] is not None
+    status = service.get_batch_status(db_session, "cancelled-batch")
+    assert status["status_count"][OperationStatus.CANCELLED] == 2
+    assert status["finished_operations"] == 3
+    assert service.get_operation_stats(db_session)["status_count"]["cancelled"] == 2
+    assert service.get_operation_stats(db_session)["status_count"]["pending"] == 0
+
+    with pytest.raises(service.OperationNotFoundError):
+        service.cancel_batch(db_session, "no-such-batch")
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app.core import service
+from app.models.operation import Operation, OperationStatus
+from app.schemas.operation import OperationCreate, BatchOperationCreate, BulkDeleteRequest
+
+
+def _create(db_session, data, count):
+    return [service.create_operation(db_session, OperationCreate(**data)).id for _ in range(count)]
+
+
+def test_bulk_get_reports_missing(db_session, sample_operation_data):
+    ids = _create(db_session, sample_operation_data, 3)
+
+    rows, missing = service.get_operation_rows_bulk(db_session, [ids[2], 404, ids[0], ids[2]])
+    assert [row.id for row in rows] == [ids[2], ids[0]]
+    assert missing == [404]
+
+
+def test_bulk_delete_by_ids_in_chunks(db_session, sample_operation_data):
+    ids = _create(db_session, sample_operation_data, 5)
+
+    deleted = service.delete_operations(db_session, operation_ids=ids[:4] + [404], chunk_size=2)
+    assert deleted == 4
+    assert [op.id for op in db_session.query(Operation).all()] == [ids[4]]
+    assert service.get_operation_stats(db_session)["status_count"]["pending"] == 1
+
+
+@patch('app.core.service.create_batch_processing_task')
+def test_bulk_delete_by_filter(mock_create_batch_task, db_session, sample_operation_data):
+    mock_create_batch_task.return_value.id = "mocked-task-id"
+    _create(db_session, sample_operation_data, 2)
+    service.create_batch_operations(db_session, BatchOperationCreate(
+        operations=[OperationCreate(**sample_operation_data) for _ in range(3)],
+        batch_id="cleanup-batch"
+    ))
+
+    deleted = service.delete_operations(
+        db_session, batch_id="cleanup-batch", status=OperationStatus.PENDING, chunk_size=2
+    )
+    assert deleted == 3
+    assert db_session.query(Operation).count() == 2
+
+    assert service.delete_operations(db_session, older_than=datetime.utcnow() - timedelta(days=1)) == 0
+
+
+def test_bulk_delete_requires_criteria(db_session):
+    with pytest.raises(service.ValidationError):
+        service.delete_operations(db_session)
+
+
+def test_bulk_delete_empty_batch_id_deletes_nothing(db_session, sample_operation_data):
+    _create(db_session, sample_operation_data, 3)
+
+    with pytest.raises(ValueError):
+        BulkDeleteRequest(batch_id="")
+    # Passed straight to the service, "" is a real filter that matches no batch
+    assert service.delete_operations(db_session, batch_id="") == 0
+    assert db_session.query(Operation).count() == 3
@@ -0,0 +1,68 @@
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import service
+from app.core.database import Base, ReadRouter
+from app.schemas.operation import OperationCreate
+
+
+@pytest.fixture
+def primary_and_replica(tmp_path):
+    # Two separate local databases standing in for the primary and its replica
+    sessionmakers = []
+    for name in ("primary", "replica"):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(bind=engine)
+        sessionmakers.append(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    return sessionmakers
+
+
+def _count(router, **kwargs):
+    with router.session(**kwargs) as db:
+        return len(service.list_operations(db))
+
+
+def test_reads_go_to_replica(primary_and_replica, sample_operation_data):
+    primary, replica = primary_and_replica
+    with primary() as db:
+        service.create_operation(db, OperationCreate(**sample_operation_data))
+
+    router = ReadRouter(primary, replica)
+    # The replica hasn't received the row, which shows where the read was served from
+    assert _count(router) == 0
+    assert _count(router, prefer_primary=True) == 1
+
+
+def test_lagging_replica_falls_back_to_primary(primary_and_replica, sample_operation_data):
+    primary, replica = primary_and_replica
+    with primary() as db:
+        service.create_operation(db, OperationCreate(**sample_operation_data))
+
+    router = ReadRouter(primary, replica, max_lag=5.0, check_interval=60.0)
+    with patch.object(ReadRouter, "_measure_lag", return_value=30.0) as measure_lag:
+        assert _count(router) == 1
+        assert _count(router) == 1
+    # The lag probe is cached for check_interval
+    assert measure_lag.call_count == 1
+
+
+def test_unreachable_replica_falls_back_to_primary(primary_and_replica, sample_operation_data):
+    primary, _ = primary_and_replica
+    with primary() as db:
+        service.create_operation(db, OperationCreate(**sample_operation_data))
+
+    def broken_replica():
+        raise ConnectionError("replica down")
+
+    router = ReadRouter(primary, broken_replica)
+    assert router.replica_lag() is None
+    assert _count(router) == 1
+
+
+def test_no_replica_configured(primary_and_replica):
+    primary, _ = primary_and_replica
+    router = ReadRouter(primary)
+    assert router.use_replica() is False
@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.core import service
+from app.models.operation import OperationStatus
+from app.schemas.operation import OperationCreate, BatchOperationCreate
+from app.tasks import dispatch
+
+
+def test_in_process_dispatch_operation(worker, db_session, sample_operation_data):
+    operation = service.create_operation(db_session, OperationCreate(**sample_operation_data))
+
+    result = dispatch.get_dispatcher().dispatch_operation(operation.id)
+    assert result.id is not None
+
+    db_session.expire_all()
+    operation = service.get_operation(db_session, operation.id)
+    assert operation.status == OperationStatus.COMPLETED
+    assert operation.result == 30
+
+
+def test_in_process_dispatch_batch(worker, db_session, sample_operation_data):
+    batch = BatchOperationCreate(
+        operations=[OperationCreate(**sample_operation_data) for _ in range(3)],
+        batch_id="in-process-batch"
+    )
+    response = service.create_batch_operations(db_session, batch)
+
+    db_session.expire_all()
+    status = service.get_batch_status(db_session, response.batch_id)
+    assert status["status_count"][OperationStatus.COMPLETED] == 3
+    assert status["finished_operations"] == 3
+    assert status["finalized_at"] is not None
+
+
+def test_import_app_main_is_lazy(tmp_path):
+    # Importing the API must not pull in Celery, the DB driver, build the engine or read settings;
+    # run away from .env and without the service environment to prove it
+    code = (
+        "import sys\n"
+        "import app.main\n"
+        "from app.core.config import get_settings\n"
+        "from app.core.database import get_engine\n"
+        "heavy = [m for m in ('celery', 'kombu', 'redis', 'psycopg2') if m in sys.modules]\n"
+        "assert not heavy, heavy\n"
+        "assert get_engine.cache_info().currsize == 0\n"
+        "assert get_settings.cache_info().currsize == 0\n"
+    )
+    env = {
+        name: value for name, value in os.environ.items()
+        if not name.startswith(("POSTGRES_", "REDIS_", "CELERY_"))
+    }
+    env["PYTHONPATH"] = str(Path(__file__).parents[2])
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=tmp_path, env=env)
+
+
+def test_incomplete_dispatcher_fails_on_instantiation():
+    class PublishOnly(dispatch.TaskDispatcher):
+        def dispatch_operation(self, operation_id, priority=9):
+            return dispatch.DispatchResult(None)
+
+    with pytest.raises(TypeError):
+        PublishOnly()
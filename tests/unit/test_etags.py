@@ -0,0 +1,74 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from app.core import batches, service
+from app.models.batch import Batch
+from app.models.operation import OperationStatus
+from app.schemas.operation import OperationCreate, BatchOperationCreate
+
+
+def test_operation_etag_matches_version_query(db_session, sample_operation_data):
+    operation = service.create_operation(db_session, OperationCreate(**sample_operation_data))
+
+    etag = service.get_operation_etag(db_session, operation.id)
+    assert etag == service.operation_etag(operation)
+    assert service.get_operation_etag(db_session, operation.id) == etag
+    assert service.get_operation_etag(db_session, 404) is None
+
+    operation.status = OperationStatus.COMPLETED
+    operation.updated_at = datetime.utcnow()
+    db_session.commit()
+    assert service.get_operation_etag(db_session, operation.id) != etag
+
+
+def test_list_etag_matches_loaded_rows(db_session, sample_operation_data):
+    for _ in range(3):
+        service.create_operation(db_session, OperationCreate(**sample_operation_data))
+
+    rows = service.list_operation_rows(db_session, 0, 10)
+    etag = service.list_operations_etag(db_session, 0, 10)
+    assert etag == service.operation_rows_etag(0, 10, rows)
+    assert service.list_operations_etag(db_session, 0, 2) != etag
+
+    service.create_operation(db_session, OperationCreate(**sample_operation_data))
+    assert service.list_operations_etag(db_session, 0, 10) != etag
+
+
+@patch('app.core.service.create_batch_processing_task')
+def test_batch_status_etag_changes_with_progress(mock_create_batch_task, db_session, sample_operation_data):
+    mock_create_batch_task.return_value.id = "mocked-task-id"
+    service.create_batch_operations(db_session, BatchOperationCreate(
+        operations=[OperationCreate(**sample_operation_data) for _ in range(2)],
+        batch_id="etag-batch"
+    ))
+
+    etag = service.get_batch_status_etag(db_session, "etag-batch")
+    assert etag == service.get_batch_status_etag(db_session, "etag-batch")
+    assert service.get_batch_status_etag(db_session, "missing-batch") is None
+
+    # Finishing an operation bumps the batch row's counters
+    batches.record_finished(db_session, "etag-batch", completed=1)
+    db_session.commit()
+    finished = service.get_batch_status_etag(db_session, "etag-batch")
+    assert finished != etag
+
+    # A claim leaves the counters alone but changes the report
+    first, second = db_session.query(service.models.Operation).order_by(service.models.Operation.id).all()
+    first.status = OperationStatus.IN_PROGRESS
+    db_session.commit()
+    claimed = service.get_batch_status_etag(db_session, "etag-batch")
+    assert claimed != finished
+
+    # So does deleting a member; once none are left the batch is gone
+    service.delete_operation(db_session, second.id)
+    assert service.get_batch_status_etag(db_session, "etag-batch") not in (None, claimed)
+    service.delete_operation(db_session, first.id)
+    assert service.get_batch_status_etag(db_session, "etag-batch") is None
+
+    # Batches without a row (created before the batches table) still get a version
+    db_session.query(Batch).delete()
+    db_session.commit()
+    service.create_operation(db_session, OperationCreate(
+        **{**sample_operation_data, "extra_data": {"batch_id": "legacy-batch"}}
+    ))
+    assert service.get_batch_status_etag(db_session, "legacy-batch") is not None
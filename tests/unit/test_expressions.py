@@ -0,0 +1,97 @@
+import pytest
+from pydantic import ValidationError
+
+from app.core import batches, expressions, service
+from app.models.operation import Operation, OperationStatus
+from app.schemas.operation import OperationCreate, ExpressionTerms, Terms
+from app.tasks import processing
+
+
+def test_evaluate_terms():
+    assert expressions.evaluate_terms({"a": 2, "b": 3}) == 5
+    terms = {"expression": "(a + b) * c - -2", "operands": {"a": 1, "b": 2, "c": 4}}
+    assert expressions.evaluate_terms(terms) == 14
+    assert expressions.evaluate_terms({"expression": "x * y * z + 1", "operands": {"x": 2, "y": 3, "z": 4}}) == 25
+
+
+def test_plans_are_cached_by_shape():
+    first = expressions.compile_expression("a*b + c")
+    assert expressions.compile_expression(" a * b +c ") is first
+    assert first.variables == ("a", "b", "c")
+    assert expressions.compile_expression("a + b") is expressions.ADDITION
+
+
+def test_evaluate_batch_matches_row_by_row():
+    plan = expressions.compile_expression("(a - b) * (a + 3)")
+    rows = [{"a": i, "b": i * 2} for i in range(10)]
+    assert expressions.evaluate_batch(plan, rows) == [plan.evaluate(row) for row in rows]
+
+
+@pytest.mark.parametrize("expression", ["a / b", "a ** b", "f(a)", "a.b", "a +", "1.5 * a"])
+def test_unsupported_expressions(expression):
+    with pytest.raises(expressions.ExpressionError):
+        expressions.compile_expression(expression)
+
+
+def test_expression_terms_schema(sample_operation_data):
+    data = dict(sample_operation_data, terms={"expression": "a * b", "operands": {"a": 2, "b": 3}})
+    operation = OperationCreate(**data)
+    assert isinstance(operation.terms, ExpressionTerms)
+    assert isinstance(OperationCreate(**sample_operation_data).terms, Terms)
+
+    with pytest.raises(ValidationError):
+        OperationCreate(**dict(data, terms={"expression": "a * b", "operands": {"a": 2}}))
+    with pytest.raises(ValidationError):
+        OperationCreate(**dict(data, terms={"expression": "a / b", "operands": {"a": 2, "b": 1}}))
+
+
+def test_process_operation_chunk(worker, db_session, sample_operation_data):
+    terms = [
+        {"a": 1, "b": 2},
+        {"expression": "a * b * c", "operands": {"a": 2, "b": 3, "c": 4}},
+        {"expression": "a*b*c", "operands": {"a": 1, "b": 1, "c": 5}},
+        {"a": 10, "b": 20},
+    ]
+    ids = [
+        service.create_operation(db_session, OperationCreate(**dict(sample_operation_data, terms=t))).id
+        for t in terms
+    ]
+    # A row that slipped in without usable terms fails alone, the rest of its plan group completes
+    broken = Operation(title="broken", type=sample_operation_data["type"],
+                       terms={"expression": "a*b*c", "operands": {"a": 1}})
+    db_session.add(broken)
+    batches.create(db_session, "chunk-batch", total=len(ids) + 2)
+    db_session.commit()
+
+    summary = processing.process_operation_chunk(ids + [broken.id, 999], "chunk-batch")
+
+    assert summary == {"completed": 4, "failed": 1, "not_found": 1}
+    db_session.expire_all()
+    results = [db_session.query(Operation).get(op_id).result for op_id in ids]
+    assert results == [3, 24, 5, 30]
+    assert db_session.query(Operation).get(broken.id).status == OperationStatus.FAILED
+    assert batches.get(db_session, "chunk-batch").finalized_at is not None
+
+
+def test_deeply_nested_expression_is_rejected():
+    with pytest.raises(expressions.ExpressionError):
+        expressions.compile_expression("-" * 999 + "a")
+
+
+def test_out_of_range_result_fails_only_its_row(worker, db_session):
+    ids = [
+        service.create_operation(db_session, OperationCreate(title="t", type="regular", terms=terms)).id
+        for terms in (
+            {"expression": "a * a * a", "operands": {"a": 10 ** 7}},
+            {"expression": "a * b", "operands": {"a": 2, "b": 3}},
+            {"a": 1, "b": 2},
+        )
+    ]
+
+    assert processing.process_operation_chunk(ids) == {"completed": 2, "failed": 1, "not_found": 0}
+
+    db_session.expire_all()
+    statuses = [db_session.query(Operation).get(i).status for i in ids]
+    assert statuses == [OperationStatus.FAILED, OperationStatus.COMPLETED, OperationStatus.COMPLETED]
+    with pytest.raises(ValidationError):
+        OperationCreate(title="t", type="regular", terms={"expression": "a", "operands": {"a": 2 ** 31}})
@@ -0,0 +1,119 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.core import idempotency, service
+from app.models.operation import Operation
+from app.schemas.operation import OperationCreate, BatchOperationCreate
+
+
+@patch('app.core.service.create_batch_processing_task')
+def test_replayed_batch_returns_original_response(mock_create_batch_task, db_session, sample_operation_data):
+    mock_create_batch_task.return_value.id = "mocked-task-id"
+    batch = BatchOperationCreate(operations=[OperationCreate(**sample_operation_data) for _ in range(3)])
+
+    first = service.create_batch_operations(db_session, batch, idempotency_key="retry-1")
+    # A retry arriving at another process: nothing cached in memory, answered from the table
+    idempotency.clear_cache()
+    second = service.create_batch_operations(db_session, batch, idempotency_key="retry-1")
+
+    assert second == first
+    assert second.task_id == "mocked-task-id"
+    assert db_session.query(Operation).count() == 3
+    mock_create_batch_task.assert_called_once()
+
+
+@patch('app.core.service.create_batch_processing_task')
+def test_client_batch_id_acts_as_idempotency_key(mock_create_batch_task, db_session, sample_operation_data):
+    mock_create_batch_task.return_value.id = "mocked-task-id"
+    batch = BatchOperationCreate(
+        operations=[OperationCreate(**sample_operation_data) for _ in range(2)],
+        batch_id="client-batch"
+    )
+
+    first = service.create_batch_operations(db_session, batch)
+    second = service.create_batch_operations(db_session, batch)
+
+    assert second.successful_operations == first.successful_operations
+    assert db_session.query(Operation).count() == 2
+    mock_create_batch_task.assert_called_once()
+
+
+@patch('app.core.service.create_batch_processing_task')
+def test_batch_id_reused_under_another_key_is_rejected(mock_create_batch_task, db_session, sample_operation_data):
+    mock_create_batch_task.return_value.id = "mocked-task-id"
+    batch = BatchOperationCreate(
+        operations=[OperationCreate(**sample_operation_data)],
+        batch_id="client-batch"
+    )
+
+    service.create_batch_operations(db_session, batch, idempotency_key="key-1")
+    with pytest.raises(service.DuplicateBatchError):
+        service.create_batch_operations(db_session, batch, idempotency_key="key-2")
+    assert db_session.query(Operation).count() == 1
+
+
+@patch('app.core.service.dispatch_operation')
+def test_create_operation_once(mock_dispatch, db_session, sample_operation_data):
+    mock_dispatch.return_value.id = "task-1"
+    operation = OperationCreate(**sample_operation_data)
+
+    first, created = service.create_operation_once(db_session, operation, "single-1")
+    assert created
+    replayed, created = service.create_operation_once(db_session, operation, "single-1")
+    assert not created
+    assert replayed.id == first.id
+
+    other, created = service.create_operation_once(db_session, operation, "single-2")
+    assert created
+    assert other.id != first.id
+    assert mock_dispatch.call_count == 2
+
+
+@patch('app.core.service.dispatch_operation')
+def test_concurrent_duplicate_loses_the_race(mock_dispatch, db_session, sample_operation_data):
+    mock_dispatch.return_value.id = "task-1"
+    operation = OperationCreate(**sample_operation_data)
+    first = service.create_operation(db_session, operation, idempotency_key="race-1")
+
+    # Both requests passed the lookup before either committed
+    with patch('app.core.service.get_replayed_operation', side_effect=[None, first]):
+        replayed, created = service.create_operation_once(db_session, operation, "race-1")
+
+    assert not created
+    assert replayed.id == first.id
+    assert db_session.query(Operation).count() == 1
+
+
+@patch('app.core.service.create_batch_processing_task')
+def test_retry_dispatches_when_the_first_dispatch_failed(mock_create_batch_task, db_session, sample_operation_data):
+    batch = BatchOperationCreate(operations=[OperationCreate(**sample_operation_data) for _ in range(2)])
+    mock_create_batch_task.side_effect = ConnectionError("broker down")
+    with pytest.raises(service.BatchOperationError):
+        service.create_batch_operations(db_session, batch, idempotency_key="flaky-1")
+
+    mock_create_batch_task.side_effect = None
+    mock_create_batch_task.return_value.id = "mocked-task-id"
+    retried = service.create_batch_operations(db_session, batch, idempotency_key="flaky-1")
+    again = service.create_batch_operations(db_session, batch, idempotency_key="flaky-1")
+
+    assert retried.task_id == again.task_id == "mocked-task-id"
+    assert db_session.query(Operation).count() == 2
+    assert mock_create_batch_task.call_count == 2
+
+
+@patch('app.core.service.dispatch_operation')
+def test_retry_dispatches_operation_when_the_first_dispatch_failed(mock_dispatch, db_session, sample_operation_data):
+    operation = OperationCreate(**sample_operation_data)
+    mock_dispatch.side_effect = ConnectionError("broker down")
+    with pytest.raises(ConnectionError):
+        service.create_operation_once(db_session, operation, "flaky-2")
+
+    mock_dispatch.side_effect = None
+    mock_dispatch.return_value.id = "task-2"
+    replayed, created = service.create_operation_once(db_session, operation, "flaky-2")
+    service.create_operation_once(db_session, operation, "flaky-2")
+
+    assert not created
+    assert mock_dispatch.call_count == 2
+    assert db_session.query(Operation).count() == 1
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from app.core import batches, service, stats
+from app.models.operation import OperationStatus
+from app.schemas.operation import OperationCreate
+from app.tasks import processing
+
+
+def _abandon(db_session, operation, attempts=1):
+    """Leave the operation as a worker that died right after claiming it would"""
+    stats.record_transition(db_session, operation.type, operation.status, OperationStatus.IN_PROGRESS)
+    operation.status = OperationStatus.IN_PROGRESS
+    operation.lease_expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    operation.attempts = attempts
+    db_session.commit()
+
+
+def test_claim_sets_and_clears_lease(worker, db_session, sample_operation_data):
+    operation = service.create_operation(db_session, OperationCreate(**sample_operation_data))
+    processing.process_operation(operation.id)
+
+    db_session.expire_all()
+    assert (operation.status, operation.attempts, operation.lease_expires_at) == (OperationStatus.COMPLETED, 1, None)
+
+
+def test_reaper_requeues_expired_leases(worker, db_session, sample_operation_data):
+    operation = service.create_operation(db_session, OperationCreate(**sample_operation_data))
+    live = service.create_operation(db_session, OperationCreate(**sample_operation_data))
+    _abandon(db_session, operation)
+    live.status = OperationStatus.IN_PROGRESS
+    live.lease_expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+    db_session.commit()
+
+    summary = processing.reap_expired_leases()
+    assert summary["requeued"] == 1 and summary["failed"] == 0
+    assert summary["lost_seconds"] > 0
+
+    db_session.expire_all()
+    assert (operation.status, operation.result, operation.attempts) == (OperationStatus.COMPLETED, 30, 2)
+    assert live.status == OperationStatus.IN_PROGRESS
+    report = service.get_operation_stats(db_session)
+    assert sum(bucket["abandoned"] for bucket in report["throughput"]) == 1
+
+
+def test_reaper_expires_operations_it_could_not_republish(worker, db_session, sample_operation_data):
+    operation = service.create_operation(db_session, OperationCreate(**sample_operation_data))
+    _abandon(db_session, operation)
+
+    with patch.object(worker, "dispatch_operation", side_effect=ConnectionError):
+        assert processing.reap_expired_leases()["requeued"] == 0
+
+    db_session.expire_all()
+    assert operation.status == OperationStatus.IN_PROGRESS
+    assert service.get_operation_stats(db_session)["status_count"]["in_progress"] == 1
+
+    # The next run finds it again
+    assert processing.reap_expired_leases()["requeued"] == 1
+    db_session.expire_all()
+    assert operation.status == OperationStatus.COMPLETED
+
+
+def test_reaper_fails_after_max_attempts(worker, db_session, sample_operation_data):
+    operation = service.create_operation(db_session, OperationCreate(**{
+        **sample_operation_data, "extra_data": {"batch_id": "stuck-batch"}
+    }))
+    batches.create(db_session, "stuck-batch", total=1)
+    _abandon(db_session, operation, attempts=3)
+
+    assert processing.reap_expired_leases()["failed"] == 1
+
+    db_session.expire_all()
+    assert operation.status == OperationStatus.FAILED
+    assert "Abandoned" in operation.extra_data["error"]
+    assert batches.get(db_session, "stuck-batch").finalized_at is not None
+
+
+def test_reaped_claim_cannot_write(worker, db_session, sample_operation_data):
+    operation = service.create_operation(db_session, OperationCreate(**sample_operation_data))
+    lease = processing._claim([operation])
+    db_session.commit()
+    assert processing._still_leased(db_session, [operation.id], lease) == [operation]
+
+    # Reaped and claimed again by another worker
+    processing._claim([operation])
+    db_session.commit()
+    assert processing._still_leased(db_session, [operation.id], lease) == []
+
+
+def test_rows_deleted_after_the_claim_count_towards_the_batch(worker, db_session, sample_operation_data):
+    ids = [
+        service.create_operation(db_session, OperationCreate(**{
+            **sample_operation_data, "extra_data": {"batch_id": "shrinking-batch"}
+        })).id
+        for _ in range(3)
+    ]
+    batches.create(db_session, "shrinking-batch", total=3)
+    db_session.commit()
+    still_leased = processing._still_leased
+    doomed = []
+
+    def delete_then_check(db, operation_ids, lease):
+        # A bulk delete lands between the claim commit and the result commit
+        service.delete_operations(db_session, operation_ids=doomed)
+        return still_leased(db, operation_ids, lease)
+
+    with patch('app.tasks.processing._still_leased', side_effect=delete_then_check):
+        doomed[:] = [ids[0]]
+        assert processing.process_operation_chunk(ids[:2], "shrinking-batch") == {
+            "completed": 1, "failed": 0, "not_found": 1
+        }
+        doomed[:] = [ids[2]]
+        assert processing.process_operation(ids[2], "shrinking-batch")["status"] == "not_found"
+
+    db_session.expire_all()
+    batch = batches.get(db_session, "shrinking-batch")
+    assert (batch.completed, batch.failed) == (1, 2)
+    assert batch.finalized_at is not None
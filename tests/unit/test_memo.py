@@ -0,0 +1,48 @@
+from unittest.mock import patch
+
+from app.core import memo, service
+from app.models.operation import Operation, OperationStatus, OperationType
+from app.schemas.operation import OperationCreate
+from app.tasks import processing
+
+
+def test_terms_key_is_canonical():
+    key = memo.terms_key(OperationType.REGULAR, {"a": 1, "b": 2})
+    assert memo.terms_key(OperationType.REGULAR, {"b": 2, "a": 1}) == key
+    assert memo.terms_key(OperationType.EXPEDITED, {"a": 1, "b": 2}) != key
+    assert memo.terms_key(OperationType.REGULAR, {"a": 1, "b": 3}) != key
+    assert memo.terms_key(
+        OperationType.REGULAR, {"expression": "a*b", "operands": {"a": 1, "b": 2}}
+    ) == memo.terms_key(OperationType.REGULAR, {"operands": {"b": 2, "a": 1}, "expression": " a * b "})
+
+
+def test_result_cache_is_bounded():
+    cache = memo.ResultCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    disabled = memo.ResultCache(0)
+    disabled.put("a", 1)
+    assert disabled.get("a") is None
+
+
+def test_chunk_evaluates_identical_terms_once(worker, db_session, sample_operation_data):
+    ids = [service.create_operation(db_session, OperationCreate(**sample_operation_data)).id for _ in range(4)]
+    other = service.create_operation(db_session, OperationCreate(**{**sample_operation_data, "terms": {"a": 1, "b": 1}}))
+
+    with patch('app.tasks.processing._evaluate', wraps=processing._evaluate) as evaluate:
+        assert processing.process_operation_chunk(ids + [other.id])["completed"] == 5
+        assert len(evaluate.call_args.args[0]) == 2
+
+        # Later work with known terms is served from the cross-batch cache
+        again = service.create_operation(db_session, OperationCreate(**sample_operation_data))
+        processing.process_operation_chunk([again.id])
+        assert evaluate.call_args.args[0] == []
+
+    db_session.expire_all()
+    results = {op.id: (op.status, op.result) for op in db_session.query(Operation).all()}
+    assert all(results[i] == (OperationStatus.COMPLETED, 30) for i in ids + [again.id])
+    assert results[other.id] == (OperationStatus.COMPLETED, 2)
+    assert service.get_operation_stats(db_session)["memoization"] == {"hits": 4, "misses": 2, "hit_rate": 4 / 6}
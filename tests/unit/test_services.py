@@ -1,8 +1,10 @@
 from unittest.mock import patch
 
-from app.core import service
+import orjson
+
+from app.core import service, serialization
 from app.models.operation import OperationStatus, OperationType
-from app.schemas.operation import OperationCreate, BatchOperationCreate
+from app.schemas.operation import OperationCreate, BatchOperationCreate, OperationOutput
 
 
 def test_create_operation(db_session, sample_operation_data):
@@ -100,3 +102,56 @@ def test_get_batch_status(mock_create_batch_task, db_session, sample_operation_d
     mock_create_batch_task.assert_called_once()
     called_operation_ids = mock_create_batch_task.call_args[0][0]  # Get first positional arg
     assert len(called_operation_ids) == 3
+
+
+def test_list_operations_extra_data_filter(db_session, sample_operation_data):
+    for source in ("import", "api", "import"):
+        data = dict(sample_operation_data)
+        data["extra_data"] = {"source": source, "attempt": 1}
+        service.create_operation(db_session, OperationCreate(**data))
+
+    operations = service.list_operations(db_session, extra_data={"source": "import", "attempt": 1})
+    assert len(operations) == 2
+    assert all(op.extra_data["source"] == "import" for op in operations)
+
+    assert service.list_operations(db_session, extra_data={"source": "missing"}) == []
+
+
+def test_list_operations_terms_filter(db_session, sample_operation_data):
+    for a in (1, 2, 2):
+        data = dict(sample_operation_data)
+        data["terms"] = {"a": a, "b": 10}
+        service.create_operation(db_session, OperationCreate(**data))
+
+    operations = service.list_operations(db_session, terms={"a": 2})
+    assert len(operations) == 2
+
+
+@patch('app.core.service.create_batch_processing_task')
+def test_list_operations_batch_filter(mock_create_batch_task, db_session, sample_operation_data):
+    mock_create_batch_task.return_value.id = "mocked-task-id"
+    service.create_operation(db_session, OperationCreate(**sample_operation_data))
+    batch_create = BatchOperationCreate(
+        operations=[OperationCreate(**sample_operation_data) for _ in range(2)],
+        batch_id="filter-batch"
+    )
+    service.create_batch_operations(db_session, batch_create)
+
+    operations = service.list_operations(db_session, batch_id="filter-batch")
+    assert len(operations) == 2
+
+
+def test_list_operation_rows_match_output_schema(db_session, sample_operation_data):
+    for i in range(3):
+        data = dict(sample_operation_data)
+        data["extra_data"] = {"index": i}
+        service.create_operation(db_session, OperationCreate(**data))
+
+    rows = service.list_operation_rows(db_session, limit=2)
+    fast = orjson.loads(serialization.operation_rows_to_json(rows))
+
+    expected = [
+        OperationOutput.model_validate(op).model_dump(mode="json")
+        for op in service.list_operations(db_session, limit=2)
+    ]
+    assert fast == expected
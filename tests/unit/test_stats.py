@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.core import service, stats
+from app.models.operation import OperationStatus, OperationType
+from app.models.stats import OperationCounter
+from app.schemas.operation import OperationCreate
+
+
+def test_stats_track_creates_and_transitions(db_session, sample_operation_data):
+    created = [
+        service.create_operation(db_session, OperationCreate(**sample_operation_data))
+        for _ in range(3)
+    ]
+
+    operation = created[0]
+    stats.record_transition(db_session, operation.type, OperationStatus.PENDING, OperationStatus.IN_PROGRESS)
+    stats.record_finished(
+        db_session, operation.type, OperationStatus.IN_PROGRESS, OperationStatus.COMPLETED,
+        datetime.utcnow() - timedelta(seconds=2)
+    )
+    db_session.commit()
+
+    result = service.get_operation_stats(db_session)
+    assert result["status_count"]["pending"] == 2
+    assert result["status_count"]["completed"] == 1
+    assert result["by_type"]["regular"]["status_count"]["pending"] == 2
+    assert result["by_type"]["expedited"]["status_count"]["pending"] == 0
+    assert result["latency"]["samples"] == 1
+    assert result["latency"]["p50"] == 2.5
+    assert sum(bucket["created"] for bucket in result["throughput"]) == 3
+    assert sum(bucket["completed"] for bucket in result["throughput"]) == 1
+
+
+def test_stats_track_deletes(db_session, sample_operation_data):
+    operation = service.create_operation(db_session, OperationCreate(**sample_operation_data))
+    service.delete_operation(db_session, operation.id)
+
+    result = service.get_operation_stats(db_session)
+    assert result["status_count"]["pending"] == 0
+
+
+def test_latency_percentiles():
+    histogram = {"0.1": 50, "1": 40, "10": 9, "inf": 1}
+    result = stats._percentiles(histogram)
+    assert result == {"p50": 0.1, "p90": 1, "p99": 10, "samples": 100}
+
+
+def test_prune_minute_counters_keeps_recent_minutes(db_session, sample_operation_data):
+    service.create_operation(db_session, OperationCreate(**sample_operation_data))
+    old = stats._minute_scope(stats._utcnow() - timedelta(days=2))
+    stats.increment(db_session, old, "regular", "completed", 5)
+    db_session.commit()
+
+    assert stats.prune_minute_counters(db_session, retention_minutes=1440) == 1
+    db_session.commit()
+
+    remaining = {row.scope for row in db_session.query(OperationCounter.scope).all()}
+    assert old not in remaining
+    assert stats.STATUS_SCOPE in remaining
+    assert any(scope.startswith(stats.MINUTE_SCOPE_PREFIX) for scope in remaining)
+
+
+def test_increments_are_applied_in_order_at_commit(db_session):
+    stats.increment(db_session, stats.STATUS_SCOPE, "regular", "pending", 2)
+    stats.increment(db_session, stats.MEMO_SCOPE, "regular", "hits", 1)
+    stats.increment(db_session, stats.STATUS_SCOPE, "regular", "pending", 1)
+    assert db_session.query(OperationCounter).count() == 0
+
+    statements = []
+    with patch.object(db_session, "execute", side_effect=lambda s: statements.append(s.compile().params)):
+        stats.apply_increments(db_session)
+    assert [(p["scope"], p["name"], p["value"]) for p in statements] == [
+        (stats.MEMO_SCOPE, "hits", 1), (stats.STATUS_SCOPE, "pending", 3)
+    ]
+    assert len({p["shard"] for p in statements}) == 1
+
+
+def test_increments_are_discarded_on_rollback(db_session):
+    stats.increment(db_session, stats.STATUS_SCOPE, "regular", "pending", 2)
+    db_session.rollback()
+    db_session.commit()
+    assert db_session.query(OperationCounter).count() == 0
+
+    stats.increment(db_session, stats.STATUS_SCOPE, "regular", "pending", 2)
+    db_session.commit()
+    assert db_session.query(OperationCounter.value).scalar() == 2
+
+
+def test_latency_covers_only_the_window(db_session):
+    old = stats._minute_scope(stats._utcnow() - timedelta(minutes=90))
+    stats.increment(db_session, old, "regular", stats._latency_bucket(3000), 10)
+    stats.record_finished(
+        db_session, OperationType.REGULAR, OperationStatus.IN_PROGRESS, OperationStatus.COMPLETED,
+        datetime.utcnow() - timedelta(seconds=2)
+    )
+    db_session.commit()
+
+    assert stats.get_stats(db_session, window_minutes=60)["latency"] == {"p50": 2.5, "p90": 2.5, "p99": 2.5, "samples": 1}
+    assert stats.get_stats(db_session, window_minutes=120)["latency"]["samples"] == 11
+
+    # Pruning ages the histogram out with the rest of the minute
+    stats.prune_minute_counters(db_session, retention_minutes=60)
+    db_session.commit()
+    assert stats.get_stats(db_session, window_minutes=120)["latency"]["samples"] == 1